@@ -0,0 +1,232 @@
+## auth.py
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import metrics
+
+CHECK_SECONDS = metrics.histogram('auth_password_check_seconds',
+                                  'Time from submitting a bcrypt check to its result, queueing included')
+CHECKS = metrics.counter('auth_password_checks_total', 'Password checks by outcome', ('result',))
+
+def check_password(password: bytes, hashed_password: bytes) -> bool:
+    """
+    Verifies a password against its bcrypt hash. Kept at module level so it
+    can be shipped to a process pool.
+
+    Args:
+        password (bytes): The UTF-8 encoded password to verify.
+        hashed_password (bytes): The bcrypt hash to verify against.
+
+    Returns:
+        bool: True if the password matches the hash, False otherwise.
+    """
+    # Imported on first use, so processes that never check a password never load bcrypt
+    import bcrypt
+    return bcrypt.checkpw(password, hashed_password)
+
+
+class AuthenticatorBusy(Exception):
+    """
+    Raised when the authentication queue is full and a new check is refused.
+    """
+
+
+class Authenticator:
+    """
+    The Authenticator class runs bcrypt password checks on a bounded worker
+    pool so they never stall the server's event loop. It also limits how
+    often a host may attempt to authenticate, remembers recently verified
+    credentials for a short while and issues session tokens that let a
+    reconnecting client resume its identity without paying for bcrypt again.
+    """
+
+    def __init__(self, hashed_password: bytes, workers: int = 2, max_pending: int = 64,
+                 use_processes: bool = False, max_attempts_per_connection: int = 3,
+                 max_attempts_per_host: int = 20, attempt_window: float = 60.0,
+                 credential_ttl: float = 300.0, session_ttl: float = 600.0):
+        """
+        Initializes the authenticator and its worker pool.
+
+        Args:
+            hashed_password (bytes): The bcrypt hash clients must match.
+            workers (int): The number of pool workers running bcrypt.
+            max_pending (int): The most checks allowed queued or running at once.
+            use_processes (bool): Run checks in a process pool instead of a thread pool.
+            max_attempts_per_connection (int): Failed password attempts allowed before a connection is dropped.
+            max_attempts_per_host (int): Failed password attempts allowed per host within attempt_window.
+            attempt_window (float): The length of the per-host rate limiting window in seconds.
+            credential_ttl (float): How long a verified credential skips bcrypt, in seconds.
+            session_ttl (float): How long an issued session token can be resumed, in seconds.
+        """
+        self.hashed_password = hashed_password
+        self.max_pending = max_pending
+        self.max_attempts_per_connection = max_attempts_per_connection
+        self.max_attempts_per_host = max_attempts_per_host
+        self.attempt_window = attempt_window
+        self.credential_ttl = credential_ttl
+        self.session_ttl = session_ttl
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.executor = executor_class(max_workers=workers)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self._cache_key = secrets.token_bytes(32)
+        self._verified = {}  # credential digest: expiry time
+        self._attempts = {}  # host: [window start, attempt count]
+        self._sessions = {}  # session token: (client_id, expiry time)
+        self.session_prefix = ''  # Starts every issued token, e.g. to tell which worker process issued it
+        self._next_sweep = time.monotonic() + attempt_window
+
+    def allow_attempt(self, host: str) -> bool:
+        """
+        Records a password attempt from a host and checks it against the limit.
+
+        Args:
+            host (str): The peer host the attempt came from.
+
+        Returns:
+            bool: True if the attempt may proceed, False if the host is over its limit.
+        """
+        now = time.monotonic()
+        self._sweep(now)
+        window = self._attempts.get(host)
+        if window is None or now - window[0] >= self.attempt_window:
+            self._attempts[host] = [now, 1]
+            return True
+        window[1] += 1
+        return window[1] <= self.max_attempts_per_host
+
+    def refund_attempt(self, host: str) -> None:
+        """
+        Gives back an attempt allow_attempt recorded once its password turned
+        out to be correct, so only failed attempts count against a host's limit.
+
+        Args:
+            host (str): The peer host the attempt came from.
+        """
+        window = self._attempts.get(host)
+        if window is not None and window[1] > 0:
+            window[1] -= 1
+
+    def submit(self, password: str) -> Future:
+        """
+        Schedules a password check. Recently verified credentials resolve
+        immediately without touching the pool.
+
+        Args:
+            password (str): The password provided by the client.
+
+        Returns:
+            Future: A future resolving to True if the password is correct.
+
+        Raises:
+            AuthenticatorBusy: If max_pending checks are already queued or running.
+        """
+        password_bytes = password.encode('utf-8')
+        digest = hmac.new(self._cache_key, password_bytes, hashlib.sha256).digest()
+        now = time.monotonic()
+        with self.lock:
+            expiry = self._verified.get(digest)
+            if expiry is not None and expiry > now:
+                CHECKS.labels('cached').inc()
+                future = Future()
+                future.set_result(True)
+                return future
+            if self.pending >= self.max_pending:
+                CHECKS.labels('busy').inc()
+                raise AuthenticatorBusy("Too many authentication requests in progress")
+            self.pending += 1
+
+        started = time.perf_counter()
+        future = self.executor.submit(check_password, password_bytes, self.hashed_password)
+        future.add_done_callback(lambda done: self._check_finished(digest, done, started))
+        return future
+
+    def issue_session(self, client_id: str) -> str:
+        """
+        Creates a session token a reconnecting client can use to resume its identity.
+
+        Args:
+            client_id (str): The identifier of the authenticated client.
+
+        Returns:
+            str: The session token.
+        """
+        token = self.session_prefix + secrets.token_urlsafe(24)
+        self._sessions[token] = (client_id, time.monotonic() + self.session_ttl)
+        return token
+
+    def resume_session(self, token: str) -> Optional[str]:
+        """
+        Consumes a session token. Tokens are single use; a fresh one is issued
+        on every successful authentication.
+
+        Args:
+            token (str): The session token presented by the client.
+
+        Returns:
+            Optional[str]: The client identifier the token was issued for, or None if unknown or expired.
+        """
+        session = self._sessions.pop(token, None)
+        if session is None or session[1] <= time.monotonic():
+            return None
+        return session[0]
+
+    def sessions(self) -> list:
+        """
+        Returns the live session tokens with wall-clock expiry times, for
+        persisting them. Safe to call from any thread.
+
+        Returns:
+            list: (token, client_id, expiry as a time.time() timestamp) tuples.
+        """
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        # Copying the dict is a single step, so the event loop cannot change it midway
+        return [(token, client_id, expires_at + offset)
+                for token, (client_id, expires_at) in dict(self._sessions).items() if expires_at > now]
+
+    def restore_session(self, token: str, client_id: str, expires_at: float) -> None:
+        """
+        Re-creates a session token persisted by an earlier process.
+
+        Args:
+            token (str): The session token.
+            client_id (str): The identifier of the client it was issued for.
+            expires_at (float): Its expiry as a time.time() timestamp.
+        """
+        self._sessions[token] = (client_id, time.monotonic() + expires_at - time.time())
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker pool, abandoning checks that have not started yet.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _check_finished(self, digest: bytes, future: Future, started: float) -> None:
+        """
+        Releases the pending slot of a finished check and caches the credential if it was valid.
+        """
+        CHECK_SECONDS.observe(time.perf_counter() - started)
+        verified = not future.cancelled() and future.exception() is None and future.result()
+        CHECKS.labels('verified' if verified else 'rejected').inc()
+        with self.lock:
+            self.pending -= 1
+            if verified:
+                self._verified[digest] = time.monotonic() + self.credential_ttl
+
+    def _sweep(self, now: float) -> None:
+        """
+        Drops expired rate limiting windows, credentials and sessions, at most once per attempt window.
+        """
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.attempt_window
+        self._attempts = {host: window for host, window in self._attempts.items()
+                          if now - window[0] < self.attempt_window}
+        self._sessions = {token: session for token, session in self._sessions.items() if session[1] > now}
+        with self.lock:
+            self._verified = {digest: expiry for digest, expiry in self._verified.items() if expiry > now}
@@ -0,0 +1,94 @@
+## benchmarks/bench_broadcast.py
+"""
+Measures the cost of pushing one message to many clients: encoding it for
+every recipient with send_message_to_client, against encoding it once per
+codec with broadcast.
+
+The recipients are Connections around unconnected sockets registered with a
+server that is never started, so only encoding and queueing are measured;
+the queues are emptied between fan-outs instead of being sent.
+
+Usage: python3 part2/benchmarks/bench_broadcast.py [--recipients N] [--fanouts N] [--binary-share F]
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection import Connection
+from server import Server
+
+MESSAGES = {
+    'guess_made': {'type': 'guess_made', 'game_id': 'game_1', 'guess': 'crane', 'attempts': 3, 'feedback': 'HPMMH'},
+    'opponents_list': {'type': 'opponents_list', 'opponents': [f'client_{number}' for number in range(50)],
+                       'next_offset': 50},
+}
+
+def make_recipients(server: Server, count: int, binary_share: float) -> list:
+    """
+    Registers count connections with the server, the first binary_share of them using the binary codec.
+
+    Returns:
+        list: The connections' sockets.
+    """
+    sockets = []
+    for number in range(count):
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        connection = Connection(client_socket, ('localhost', number), server.max_outgoing_bytes)
+        if number < count * binary_share:
+            connection.protocol.set_codec('binary')
+        server.connections[client_socket] = connection
+        sockets.append(client_socket)
+    return sockets
+
+def reset(server: Server) -> None:
+    """
+    Empties every send queue without sending anything.
+    """
+    for connection in server.connections.values():
+        connection.outgoing.clear()
+        connection.outgoing_bytes = 0
+    server._flush_queue.clear()
+
+def bench(server: Server, sockets: list, message: dict, fanouts: int) -> tuple:
+    """
+    Returns:
+        tuple: (seconds per fan-out with one send_message_to_client per recipient, seconds per broadcast fan-out).
+    """
+    results = []
+    for send in (lambda: [server.send_message_to_client(client_socket, message) for client_socket in sockets],
+                 lambda: server.broadcast(sockets, message)):
+        elapsed = 0.0
+        for _ in range(fanouts):
+            started = time.perf_counter()
+            send()
+            elapsed += time.perf_counter() - started
+            reset(server)
+        results.append(elapsed / fanouts)
+    return tuple(results)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--recipients', type=int, default=1000, help="Clients each message goes to.")
+    parser.add_argument('--fanouts', type=int, default=200, help="Fan-outs timed per message and method.")
+    parser.add_argument('--binary-share', type=float, default=0.5,
+                        help="The fraction of recipients that negotiated the binary codec.")
+    args = parser.parse_args()
+
+    server = Server('localhost', 0)
+    sockets = make_recipients(server, args.recipients, args.binary_share)
+    try:
+        print(f"{'message':<16}{'per client us':>15}{'broadcast us':>14}{'speedup':>9}")
+        for name, message in MESSAGES.items():
+            per_client, broadcast = bench(server, sockets, message, args.fanouts)
+            print(f"{name:<16}{per_client * 1e6:>15.1f}{broadcast * 1e6:>14.1f}{per_client / broadcast:>8.1f}x")
+    finally:
+        for client_socket in sockets:
+            client_socket.close()
+        server.authenticator.executor.shutdown()
+
+if __name__ == "__main__":
+    main()
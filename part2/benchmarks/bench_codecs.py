@@ -0,0 +1,60 @@
+## benchmarks/bench_codecs.py
+"""
+Measures encode and decode cost per message for every registered codec.
+
+Usage: python3 part2/benchmarks/bench_codecs.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_codecs import CODECS
+from protocol import Protocol
+
+SAMPLE_MESSAGES = [
+    {'type': 'guess_result', 'result': False, 'feedback': 'HPMMHP'},
+    {'type': 'hint_acknowledged'},
+    {'type': 'guess', 'guess': 'banana', 'game_id': 'game_1234'},
+    {'type': 'hint', 'hint': 'It is yellow and curved', 'game_id': 'game_1234'},
+    {'type': 'hint_received', 'hint': 'It is yellow and curved'},
+    {'type': 'game_started', 'game_id': 'game_1234', 'player1': 'client_17', 'player2': 'client_42', 'word_length': 6},
+    {'type': 'guess_made', 'game_id': 'game_1234', 'guess': 'banana', 'attempts': 3, 'feedback': 'HPMMHP'},
+    {'type': 'opponents_list', 'opponents': [f"client_{i}" for i in range(20)]},
+]
+
+def bench_codec(name: str, iterations: int) -> list:
+    """
+    Times full frame encoding and decoding of each sample message with one codec.
+
+    Args:
+        name (str): The codec name.
+        iterations (int): The number of encode/decode calls to time per message.
+
+    Returns:
+        list: (message type, frame size, encode ns, decode ns) rows.
+    """
+    protocol = Protocol(name)
+    rows = []
+    for message in SAMPLE_MESSAGES:
+        frame = protocol.encode_message(message)
+        assert protocol.decode_message(frame) == message
+        encode = timeit.timeit(lambda: protocol.encode_message(message), number=iterations)
+        decode = timeit.timeit(lambda: protocol.decode_message(frame), number=iterations)
+        rows.append((message['type'], len(frame), encode / iterations * 1e9, decode / iterations * 1e9))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'codec':<8} {'message':<20} {'bytes':>6} {'encode ns':>10} {'decode ns':>10}")
+    for name in CODECS:
+        for message_type, size, encode_ns, decode_ns in bench_codec(name, args.iterations):
+            print(f"{name:<8} {message_type:<20} {size:>6} {encode_ns:>10.0f} {decode_ns:>10.0f}")
+
+if __name__ == "__main__":
+    main()
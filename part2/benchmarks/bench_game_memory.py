@@ -0,0 +1,88 @@
+## benchmarks/bench_game_memory.py
+"""
+Reports the memory held per active game, comparing the slotted Game with the
+dict-based layout it replaced.
+
+Usage: python3 part2/benchmarks/bench_game_memory.py [--games N] [--hints N]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game
+
+class DictGame:
+    """
+    The Game layout before it was slotted, with the original's fields exactly:
+    an instance __dict__, the word stored as given and an unbounded hints list.
+    """
+
+    def __init__(self):
+        self.word = ""
+        self.hints = []
+        self.attempts = 0
+        self.player1 = ""
+        self.player2 = ""
+
+    def start_game(self, player1: str, player2: str, word: str) -> None:
+        self.player1 = player1
+        self.player2 = player2
+        self.word = word
+        self.hints = []
+        self.attempts = 0
+
+    def add_hint(self, hint: str) -> None:
+        self.hints.append(hint)
+
+def measure(game_class, games: int, hints: int) -> float:
+    """
+    Creates games the way the server does and measures the memory they hold.
+
+    Args:
+        game_class: The game class to instantiate.
+        games (int): The number of games to create.
+        hints (int): The number of hints added to each game.
+
+    Returns:
+        float: The average number of bytes allocated per game.
+    """
+    # The server interns client IDs when it assigns them, but the copies in each
+    # start_game message and the word are fresh strings decoded from the wire
+    ids = [sys.intern(f"client_{i}") for i in range(games * 2)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    messages = [(''.join(ids[2 * i]), ''.join(ids[2 * i + 1]), ''.join('Banana')) for i in range(games)]
+    registry = {}
+    for i in range(games):
+        game = game_class()
+        player1, player2, word = messages[i]
+        game.start_game(player1, player2, word)
+        for h in range(hints):
+            game.add_hint('yellow')
+        registry[f"game_{i}"] = game
+    # Drop the decoded messages; only what the games still reference stays allocated
+    del messages, player1, player2, word
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / games
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--hints', type=int, default=3)
+    args = parser.parse_args()
+
+    before = measure(DictGame, args.games, args.hints)
+    after = measure(Game, args.games, args.hints)
+    print(f"{args.games} games with {args.hints} hints each (including the registry entry)")
+    print(f"before (dict-based Game): {before:8.1f} bytes per game")
+    print(f"after  (slotted Game):    {after:8.1f} bytes per game ({(1 - after / before) * 100:.0f}% less)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+## benchmarks/bench_startup.py
+"""
+Measures how long main.py takes from launch until its game server answers a
+first request, with and without the web interface.
+
+Each run starts main.py in a fresh process, connects as soon as the port
+accepts connections and sends a ping; the time to the pong covers imports,
+constructing the server and its first trip through the event loop.
+
+Usage: python3 part2/benchmarks/bench_startup.py [--runs N] [--port PORT] [--web-port PORT]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import Client
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+def time_to_first_reply(arguments: list, port: int, timeout: float = 30.0) -> float:
+    """
+    Starts main.py and times it until the game server answers a ping.
+
+    Args:
+        arguments (list): Command line arguments for main.py.
+        port (int): The port the game server listens on.
+        timeout (float): Seconds to wait before giving up.
+
+    Returns:
+        float: Seconds from launching the process to receiving the pong.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN, '--port', str(port)] + arguments,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            client = Client('tcp', 'localhost', port)
+            try:
+                client.connect_to_server()
+                break
+            except ConnectionError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"main.py exited with status {process.returncode}")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("The server did not start in time")
+                time.sleep(0.001)
+        client.wait_for(client.pipeline([{'type': 'ping'}]))
+        elapsed = time.perf_counter() - started
+        client.disconnect()
+        return elapsed
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10, help="Launches per configuration.")
+    parser.add_argument('--port', type=int, default=12398)
+    parser.add_argument('--web-port', type=int, default=5098)
+    args = parser.parse_args()
+
+    configurations = (('server only', ['--no-web']), ('with web', ['--web-port', str(args.web_port)]))
+    print(f"{'configuration':<15}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+    for name, arguments in configurations:
+        times = [time_to_first_reply(arguments, args.port) * 1000 for _ in range(args.runs)]
+        print(f"{name:<15}{min(times):>10.1f}{statistics.median(times):>12.1f}{max(times):>10.1f}")
+
+if __name__ == "__main__":
+    main()
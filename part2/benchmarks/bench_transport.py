@@ -0,0 +1,111 @@
+## benchmarks/bench_transport.py
+"""
+Compares round-trip latency and pipelined throughput of the TCP and UNIX
+domain socket transports against one server listening on both.
+
+Each transport gets an authenticated client that first sends request after
+request, waiting for every reply, and then sends them in pipelined batches.
+
+Usage: python3 part2/benchmarks/bench_transport.py [--requests N] [--batch N] [--port PORT] [--socket-path PATH]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import Client
+
+REQUEST = {'type': 'request_opponents', 'limit': 1}
+
+def spawn_server(port: int, socket_path: str) -> subprocess.Popen:
+    """
+    Starts a server listening on TCP and on a UNIX socket in a child process,
+    so the benchmark does not share an interpreter with it.
+    """
+    part2 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = f"from server import Server; Server('localhost', {port}, unix_socket_path={socket_path!r}, rate_limits=False).start_server()"
+    return subprocess.Popen([sys.executable, '-c', code], cwd=part2, stdout=subprocess.DEVNULL)
+
+def connect(server_type: str, address: str, port: int) -> Client:
+    """
+    Connects and authenticates a client, retrying while the server starts up.
+    """
+    deadline = time.monotonic() + 10
+    while True:
+        client = Client(server_type, address, port, codecs=('binary',))
+        try:
+            client.connect_to_server()
+            break
+        except ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+    client.send_password('securepassword')
+    response = client.receive_response()
+    if response['type'] != 'authentication_success':
+        raise RuntimeError(f"Authentication failed: {response}")
+    return client
+
+def bench_transport(client: Client, requests: int, batch: int) -> tuple:
+    """
+    Measures one transport.
+
+    Args:
+        client (Client): An authenticated client.
+        requests (int): The number of requests per measurement.
+        batch (int): The number of requests sent before reading their replies when pipelining.
+
+    Returns:
+        tuple: (sorted round-trip times in seconds, pipelined requests per second).
+    """
+    for _ in range(min(1000, requests)):
+        client._send_message(REQUEST)
+        client.receive_response()
+
+    round_trips = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client._send_message(REQUEST)
+        client.receive_response()
+        round_trips.append(time.perf_counter() - started)
+    round_trips.sort()
+
+    started = time.perf_counter()
+    for _ in range(requests // batch):
+        client.socket.sendall(client.protocol.encode_message(REQUEST) * batch)
+        for _ in range(batch):
+            client.receive_response()
+    throughput = (requests // batch) * batch / (time.perf_counter() - started)
+    return round_trips, throughput
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=20000, help="Requests per measurement.")
+    parser.add_argument('--batch', type=int, default=64, help="Requests per pipelined batch.")
+    parser.add_argument('--port', type=int, default=12399)
+    parser.add_argument('--socket-path', default=os.path.join(tempfile.gettempdir(), 'bench_transport.sock'))
+    args = parser.parse_args()
+
+    process = spawn_server(args.port, args.socket_path)
+    try:
+        print(f"{'transport':<10}{'p50 us':>10}{'p99 us':>10}{'p999 us':>10}{'pipelined req/s':>18}")
+        for server_type, address in (('tcp', 'localhost'), ('unix', args.socket_path)):
+            client = connect(server_type, address, args.port)
+            round_trips, throughput = bench_transport(client, args.requests, args.batch)
+            client.disconnect()
+            p50, p99, p999 = (round_trips[min(len(round_trips) - 1, int(len(round_trips) * q))] * 1e6
+                              for q in (0.5, 0.99, 0.999))
+            print(f"{server_type:<10}{p50:>10.1f}{p99:>10.1f}{p999:>10.1f}{throughput:>18,.0f}")
+    finally:
+        process.terminate()
+        process.wait()
+        # A terminated server does not get to remove its socket file
+        if os.path.exists(args.socket_path):
+            os.unlink(args.socket_path)
+
+if __name__ == "__main__":
+    main()
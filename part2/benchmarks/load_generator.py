@@ -0,0 +1,324 @@
+## benchmarks/load_generator.py
+"""
+Drives a game server with simulated players and reports throughput, latency
+percentiles per message type, connection setup time and the server's memory.
+
+Every player authenticates, asks for a match, and then plays its side of the
+game: the guesser sends wrong guesses before the right one, the player who
+picked the word answers each wrong guess with a hint, and the guesser guesses
+again once the hint arrives. Players start another round once their game is
+over. All players are multiplexed on one thread.
+
+At most --auth-window password checks are in flight at once; the server's
+credential cache answers most of them once the first one has succeeded.
+
+Usage: python3 part2/benchmarks/load_generator.py [--players N] [--rounds N] [--guesses N] [--auth-window N]
+                                                  [--spawn-server [--workers N] | --host HOST --port PORT [--server-pid PID]]
+"""
+import argparse
+import itertools
+import os
+import resource
+import selectors
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import Client
+
+PASSWORD = 'securepassword'
+
+# request type: reply types that complete it
+REPLIES = {
+    'authentication': ('authentication_success', 'authentication_failure'),
+    'find_match': ('match_queued', 'game_started'),
+    'guess': ('guess_result',),
+    'hint': ('hint_acknowledged',),
+}
+
+class Stats:
+    """
+    Collects latency samples per request type and message counts.
+    """
+
+    def __init__(self):
+        self.latencies = {request_type: [] for request_type in REPLIES}
+        self.connect_times = []
+        self.sent = 0
+        self.received = 0
+        self.errors = Counter()  # error message: count
+        self.games = 0
+        self.unmatched = 0  # Players left waiting for a match after everyone else was done
+
+    def report(self, elapsed: float) -> None:
+        """
+        Prints the collected statistics.
+
+        Args:
+            elapsed (float): The wall-clock duration of the run in seconds.
+        """
+        print(f"duration: {elapsed:.2f}s, games finished: {self.games}, errors: {sum(self.errors.values())}")
+        if self.unmatched:
+            print(f"  {self.unmatched} player(s) left without an opponent for their last rounds")
+        for error, count in self.errors.most_common(5):
+            print(f"  {count} x {error}")
+        print(f"messages: {self.sent} sent ({self.sent / elapsed:,.0f}/s), "
+              f"{self.received} received ({self.received / elapsed:,.0f}/s)")
+        print(f"{'request':<16}{'count':>9}{'p50 ms':>10}{'p99 ms':>10}{'p999 ms':>10}{'max ms':>10}")
+        rows = [('connect', self.connect_times)] + list(self.latencies.items())
+        for name, samples in rows:
+            if not samples:
+                continue
+            samples.sort()
+            print(f"{name:<16}{len(samples):>9}{percentile(samples, 50) * 1e3:>10.3f}"
+                  f"{percentile(samples, 99) * 1e3:>10.3f}{percentile(samples, 99.9) * 1e3:>10.3f}"
+                  f"{samples[-1] * 1e3:>10.3f}")
+
+
+class SimulatedPlayer:
+    """
+    The SimulatedPlayer class plays the game through a Client without blocking,
+    reacting to each message the server sends.
+    """
+
+    def __init__(self, client: Client, stats: Stats, rounds: int, guesses: int):
+        self.client = client
+        self.authenticated = False
+        self.stats = stats
+        self.rounds_left = rounds
+        self.guesses = guesses
+        self.pending = {}  # request type: time it was sent
+        self.opponent = None
+        self.attempts = 0
+        self.queued = False  # Whether the player is in the server's waiting queue
+        self.done = False
+
+    def send(self, request_type: str, message: dict) -> None:
+        self.pending[request_type] = time.perf_counter()
+        self.client._send_message(message)
+        self.stats.sent += 1
+
+    def start(self) -> None:
+        self.send('authentication', {'type': 'authentication', 'password': PASSWORD, 'codecs': self.client.codecs})
+
+    def handle(self, message: dict) -> None:
+        """
+        Records the latency of the request a message answers and takes the next step.
+
+        Args:
+            message (dict): A message received from the server.
+        """
+        self.stats.received += 1
+        message_type = message.get('type')
+        for request_type, replies in REPLIES.items():
+            if message_type in replies and request_type in self.pending:
+                self.stats.latencies[request_type].append(time.perf_counter() - self.pending.pop(request_type))
+                break
+
+        if message_type == 'authentication_success':
+            self.client.client_id = message['client_id']
+            self.authenticated = True
+            self.find_match()
+        elif message_type == 'match_queued':
+            self.queued = True
+        elif message_type == 'game_started':
+            self.queued = False
+            self.client.game_id = message['game_id']
+            if message['player2'] == self.client.client_id:
+                self.guess(message['player1'], 0)
+        elif message_type == 'hint_received':
+            self.guess(self.opponent, self.attempts)
+        elif message_type == 'guess_made' and message['attempts'] < self.guesses:
+            self.send('hint', {'type': 'hint', 'hint': f"hint {message['attempts']}", 'game_id': message['game_id']})
+        elif message_type == 'game_over':
+            self.stats.games += 1
+            self.client.game_id = None
+            self.rounds_left -= 1
+            if self.rounds_left > 0:
+                self.find_match()
+            else:
+                self.done = True
+        elif message_type in ('error', 'authentication_failure'):
+            self.stats.errors[message.get('message')] += 1
+            self.done = True
+
+    def find_match(self) -> None:
+        self.send('find_match', {'type': 'find_match', 'word': word_for(self.client.client_id)})
+
+    def give_up(self) -> None:
+        """
+        Leaves the waiting queue once no other player is left to be paired with.
+        """
+        self.client._send_message({'type': 'cancel_match'})
+        self.stats.sent += 1
+        self.stats.unmatched += 1
+        self.done = True
+
+    def guess(self, opponent: str, attempts: int) -> None:
+        self.opponent = opponent
+        self.attempts = attempts + 1
+        guess = word_for(opponent) if self.attempts >= self.guesses else wrong_guess(self.attempts)
+        self.send('guess', {'type': 'guess', 'guess': guess, 'game_id': self.client.game_id})
+
+
+WORD_LENGTH = 6
+
+def word_for(client_id: str) -> str:
+    """
+    Returns the word a player picks, so its opponent knows the right guess:
+    the player's number spelled in base 25 with the letters a to y.
+    """
+    number = int(client_id.rsplit('_', 1)[-1])
+    letters = []
+    for _ in range(WORD_LENGTH):
+        number, digit = divmod(number, 25)
+        letters.append(chr(ord('a') + digit))
+    return ''.join(letters)
+
+def wrong_guess(attempt: int) -> str:
+    """
+    Returns a guess of the right length that no player's word matches, since it contains a z.
+    """
+    return 'z' + word_for(f"_{attempt}")[1:]
+
+def percentile(samples: list, percent: float) -> float:
+    """
+    Returns a percentile of sorted samples using the nearest-rank method.
+    """
+    index = max(0, min(len(samples) - 1, int(round(percent / 100 * len(samples))) - 1))
+    return samples[index]
+
+def server_memory(pid: int) -> Optional[str]:
+    """
+    Reads the resident and peak resident memory of a process and its worker processes from /proc.
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            pids = [pid] + [int(child) for child in children.read().split()]
+        rss = peak = 0
+        for process_id in pids:
+            with open(f"/proc/{process_id}/status") as status:
+                fields = dict(line.split(':', 1) for line in status if line.startswith(('VmRSS', 'VmHWM')))
+            rss += int(fields['VmRSS'].split()[0])
+            peak += int(fields['VmHWM'].split()[0])
+    except (OSError, KeyError, ValueError):
+        return None
+    return f"rss {rss} kB, peak {peak} kB in {len(pids)} processes"
+
+def spawn_server(host: str, port: int, players: int, workers: int) -> subprocess.Popen:
+    """
+    Starts a game server, or a pool of worker processes, in a child process and
+    waits until it accepts connections. All players connect from one host, so
+    its per-host authentication limit is raised, and the players play as fast
+    as they can, so client messages are not rate limited.
+    """
+    part2 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (f"import bcrypt; from auth import Authenticator; from server import Server; from workers import WorkerPool; "
+            f"hashed = bcrypt.hashpw({PASSWORD!r}.encode('utf-8'), bcrypt.gensalt()); "
+            f"authenticator = Authenticator(hashed, max_attempts_per_host={players}); ")
+    if workers > 1:
+        code += f"WorkerPool({workers}, {host!r}, {port}, authenticator=authenticator, rate_limits=False).run()"
+    else:
+        code += f"Server({host!r}, {port}, authenticator=authenticator, rate_limits=False).start_server()"
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=part2, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("The spawned server did not start listening")
+
+def run(args: argparse.Namespace, server_pid: Optional[int]) -> None:
+    stats = Stats()
+    selector = selectors.DefaultSelector()
+    players = []
+    for _ in range(args.players):
+        client = Client('tcp', args.host, args.port, codecs=(args.codec,))
+        started = time.perf_counter()
+        client.connect_to_server()
+        stats.connect_times.append(time.perf_counter() - started)
+        player = SimulatedPlayer(client, stats, args.rounds, args.guesses)
+        selector.register(client.socket, selectors.EVENT_READ, player)
+        players.append(player)
+    if server_pid:
+        print(f"server memory with {args.players} idle connections: {server_memory(server_pid)}")
+
+    started = time.perf_counter()
+    waiting = iter(players)
+    authenticating = 0
+    for player in itertools.islice(waiting, args.auth_window):
+        player.start()
+        authenticating += 1
+    remaining = len(players)
+    deadline = time.monotonic() + args.timeout
+    while remaining and time.monotonic() < deadline:
+        for key, _ in selector.select(1.0):
+            player = key.data
+            was_authenticated = player.authenticated
+            for message in player.client.read_messages():
+                player.handle(message)
+            if not was_authenticated and (player.authenticated or player.done):
+                authenticating -= 1
+                for next_player in itertools.islice(waiting, args.auth_window - authenticating):
+                    next_player.start()
+                    authenticating += 1
+            if player.done:
+                selector.unregister(player.client.socket)
+                remaining -= 1
+        if remaining == 1:
+            # The other players may have played all their rounds among themselves, leaving the last one
+            # waiting for an opponent that never comes
+            player = next(player for player in players if not player.done)
+            if player.queued:
+                player.give_up()
+                selector.unregister(player.client.socket)
+                remaining -= 1
+    elapsed = time.perf_counter() - started
+
+    if remaining:
+        print(f"timed out with {remaining} players still playing")
+    stats.report(elapsed)
+    if server_pid:
+        print(f"server memory: {server_memory(server_pid)}")
+    for player in players:
+        player.client.disconnect()
+    selector.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--players', type=int, default=1000, help="Simulated players, rounded down to pairs.")
+    parser.add_argument('--rounds', type=int, default=5, help="Games each player plays.")
+    parser.add_argument('--guesses', type=int, default=4, help="Guesses per game, the last one right.")
+    parser.add_argument('--auth-window', type=int, default=16, help="Most authentications in flight at once.")
+    parser.add_argument('--codec', default='binary', help="The codec players ask for.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=12345)
+    parser.add_argument('--spawn-server', action='store_true', help="Start a server in a child process on --port.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes of the spawned server.")
+    parser.add_argument('--server-pid', type=int, help="Process ID of an external server, to report its memory.")
+    parser.add_argument('--timeout', type=float, default=300.0, help="Seconds to wait for the players to finish.")
+    args = parser.parse_args()
+    args.players -= args.players % 2
+
+    # Every player needs a descriptor here and in the server, which inherits the limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    process = spawn_server(args.host, args.port, args.players, args.workers) if args.spawn_server else None
+    try:
+        run(args, process.pid if process else args.server_pid)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
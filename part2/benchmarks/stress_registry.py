@@ -0,0 +1,86 @@
+## benchmarks/stress_registry.py
+"""
+Hammers the sharded game registry with concurrent guesses and hints from many
+threads and checks that no attempt or hint is lost.
+
+Usage: python3 part2/benchmarks/stress_registry.py [--threads N] [--games N] [--guesses N]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game
+from registry import GameRegistry
+
+def worker(registry: GameRegistry, game_ids: list, guesses: int, seed: int, counts: dict, barrier: threading.Barrier) -> None:
+    """
+    Sends guesses and hints to random games, tallying how many each game received.
+    """
+    rng = random.Random(seed)
+    local_counts = {}  # game_id: [attempts, hints]
+    barrier.wait()
+    for i in range(guesses):
+        game_id = rng.choice(game_ids)
+        with registry.locked(game_id) as game:
+            # Checked and scored under one lock, as the server does
+            if game.check_guess('sector') is None:
+                game.score_guess('sector')
+            if i % 10 == 0:
+                game.add_hint('hint')
+        tally = local_counts.setdefault(game_id, [0, 0])
+        tally[0] += 1
+        tally[1] += i % 10 == 0
+    counts[seed] = local_counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--games', type=int, default=256)
+    parser.add_argument('--guesses', type=int, default=20000)
+    parser.add_argument('--shards', type=int, default=64)
+    args = parser.parse_args()
+
+    # Switching threads often makes lost updates far more likely to show up
+    sys.setswitchinterval(1e-6)
+    registry = GameRegistry(args.shards)
+    game_ids = [f"game_{i}" for i in range(args.games)]
+    for game_id in game_ids:
+        game = Game()
+        game.start_game('client_1', 'client_2', 'secret')
+        registry.add(game_id, game)
+
+    counts = {}
+    barrier = threading.Barrier(args.threads + 1)
+    threads = [threading.Thread(target=worker, args=(registry, game_ids, args.guesses, seed, counts, barrier))
+               for seed in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    expected = {game_id: [0, 0] for game_id in game_ids}
+    for local_counts in counts.values():
+        for game_id, (attempts, hints) in local_counts.items():
+            expected[game_id][0] += attempts
+            expected[game_id][1] += hints
+
+    wrong = [game_id for game_id in game_ids
+             if [registry.get(game_id).attempts, registry.get(game_id).hint_count] != expected[game_id]]
+    total = args.threads * args.guesses
+    print(f"{total} guesses from {args.threads} threads over {args.games} games in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} guesses/s)")
+    if wrong:
+        print(f"FAILED: {len(wrong)} games have a wrong attempts or hints count, e.g. {wrong[:5]}")
+        sys.exit(1)
+    print("OK: every attempt and hint was counted")
+
+if __name__ == "__main__":
+    main()
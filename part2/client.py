@@ -1,28 +1,59 @@
 ## client.py
+import argparse
+import itertools
 import socket
-from protocol import Protocol
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional
+from protocol import Protocol, FrameDecoder
+from transport import create_transport
 
 class Client:
     """
     The Client class is responsible for managing the connection to the server,
     sending requests, and receiving responses.
+
+    Requests can also be pipelined: send_request() and pipeline() tag each
+    request with a request_id and return a Future, so many requests can be in
+    flight at once. The server echoes the request_id on its reply, which
+    resolves the matching Future when it is read; messages without a pending
+    request_id are pushes and are returned by receive_response() as usual.
     """
 
-    def __init__(self, server_type: str = 'tcp', server_host: str = 'localhost', server_port: int = 12345):
+    def __init__(self, server_type: str = 'tcp', server_host: str = 'localhost', server_port: int = 12345,
+                 codecs: tuple = ('binary', 'json')):
+        """
+        Initializes a disconnected client.
+
+        Args:
+            server_type (str): 'tcp', or 'unix' for a server on the same host.
+            server_host (str): The server's hostname, or the socket path for 'unix'.
+            server_port (int): The server's TCP port, unused for 'unix'.
+            codecs (tuple): Codec names to offer the server, in order of preference.
+        """
+        self.transport = create_transport(server_type, server_host, server_port, path=server_host)
         self.client_id = None
+        self.session_token = None
         self.socket = None
         self.server_host = server_host
         self.server_port = server_port
+        self.codecs = list(codecs)
         self.protocol = Protocol()
+        self.decoder = FrameDecoder(self.protocol)
+        self.received_messages = deque()
+        self.pending_requests = {}  # request_id: Future of the reply
+        self._request_ids = itertools.count(1)
+        self._send_lock = threading.Lock()  # The listener thread answers heartbeats while the menu sends requests
         self.game_id = None
+        self.opponents_offset = 0
 
     def connect_to_server(self) -> None:
         """
-        Establishes a TCP connection to the server.
+        Establishes a connection to the server over the configured transport.
         """
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.server_host, self.server_port))
+            self.socket = self.transport.connect()
         except socket.error as e:
             raise ConnectionError(f"Failed to connect to server: {e}")
 
@@ -33,14 +64,53 @@ class Client:
         Args:
             password (str): The password to authenticate with the server.
         """
-        message = {'type': 'authentication', 'password': password}
+        message = {'type': 'authentication', 'password': password, 'codecs': self.codecs}
         self._send_message(message)
 
-    def request_opponents_list(self) -> None:
+    def resume_session(self, session_token: str) -> None:
         """
-        Requests a list of available opponents from the server.
+        Authenticates with a session token from an earlier connection, keeping
+        the same client ID without sending the password again.
+
+        Args:
+            session_token (str): The session token returned by the last successful authentication.
+        """
+        message = {'type': 'authentication', 'session_token': session_token, 'codecs': self.codecs}
+        self._send_message(message)
+
+    def request_opponents_list(self, offset: int = 0, limit: Optional[int] = None, prefix: str = '') -> None:
+        """
+        Requests a page of available opponents from the server.
+
+        Args:
+            offset (int): The number of opponents to skip, taken from the previous page's next_offset.
+            limit (Optional[int]): The largest page to return, the server's default if None.
+            prefix (str): Only list opponents whose identifier starts with this prefix.
         """
         message = {'type': 'request_opponents'}
+        if offset:
+            message['offset'] = offset
+        if limit is not None:
+            message['limit'] = limit
+        if prefix:
+            message['prefix'] = prefix
+        self._send_message(message)
+
+    def find_match(self, word: str) -> None:
+        """
+        Asks the server to pair this client with any waiting player.
+
+        Args:
+            word (str): The word the opponent has to guess if this client ends up waiting for them.
+        """
+        message = {'type': 'find_match', 'word': word}
+        self._send_message(message)
+
+    def cancel_match(self) -> None:
+        """
+        Stops waiting for an automatic match.
+        """
+        message = {'type': 'cancel_match'}
         self._send_message(message)
 
     def start_game_with_opponent(self, opponent_id: str, word: str) -> None:
@@ -74,17 +144,75 @@ class Client:
         message = {'type': 'hint', 'hint': hint, 'game_id': self.game_id}
         self._send_message(message)
 
+    def send_request(self, message: dict) -> Future:
+        """
+        Sends a request without waiting for its reply.
+
+        Args:
+            message (dict): The request; a request_id is added to a copy of it.
+
+        Returns:
+            Future: Resolved with the reply once it is read, by wait_for() or a listener thread.
+        """
+        return self.pipeline([message])[0]
+
+    def pipeline(self, messages: list) -> list:
+        """
+        Sends several requests in a single write without waiting for any reply.
+
+        Args:
+            messages (list): The requests, in the order the server should process them.
+
+        Returns:
+            list: A Future for each request's reply, in the same order.
+        """
+        futures = []
+        frames = []
+        for message in messages:
+            request_id = next(self._request_ids)
+            future = Future()
+            self.pending_requests[request_id] = future
+            futures.append(future)
+            frames.append(self.protocol.encode_message(dict(message, request_id=request_id)))
+        try:
+            with self._send_lock:
+                self.socket.sendall(b''.join(frames))
+        except socket.error as e:
+            raise ConnectionError(f"Failed to send message to server: {e}")
+        return futures
+
+    def wait_for(self, futures: list) -> list:
+        """
+        Reads from the server until every given request has its reply. Pushes
+        read meanwhile are kept for receive_response(). Not for use while a
+        listener thread is reading; call result() on the futures instead.
+
+        Args:
+            futures (list): Futures returned by send_request() or pipeline().
+
+        Returns:
+            list: The replies, in the order of the futures.
+        """
+        for future in futures:
+            while not future.done():
+                self.received_messages.extend(self.read_messages())
+        return [future.result() for future in futures]
+
     def disconnect(self) -> None:
         """
         Closes the connection to the server.
         """
         if self.socket:
+            client_socket, self.socket = self.socket, None
+            try:
+                # Shutting down first wakes up a listener thread blocked in recv
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
             try:
-                self.socket.close()
+                client_socket.close()
             except socket.error as e:
                 print(f"Error closing socket: {e}")
-            finally:
-                self.socket = None
 
     def receive_response(self) -> dict:
         """
@@ -93,14 +221,53 @@ class Client:
         Returns:
             dict: The decoded message from the server.
         """
+        # Messages that arrived in the same read as an earlier response are served first
+        while not self.received_messages:
+            self.received_messages.extend(self.read_messages())
+        return self.received_messages.popleft()
+
+    def read_messages(self) -> list:
+        """
+        Reads from the socket once and decodes every message that is complete.
+        Meant for callers that multiplex many clients and only read once the
+        socket is readable. Replies to pending requests resolve their futures
+        instead of being returned.
+
+        Returns:
+            list: The decoded messages, possibly none if only part of a frame arrived.
+        """
         try:
-            message_bytes = self.socket.recv(1024)
-            if not message_bytes:
+            if not self.decoder.recv_from(self.socket):
                 raise ConnectionError("No response received from the server.")
-            return self.protocol.decode_message(message_bytes)
+            messages = []
+            for message in self.decoder.messages():
+                # Frames after a successful authentication use the negotiated codec,
+                # so switch before the generator decodes the next one
+                if message.get('type') == 'authentication_success' and 'codec' in message:
+                    self.protocol.set_codec(message['codec'])
+                if message.get('type') == 'ping':
+                    # Heartbeats are answered here, so every way of reading keeps the connection alive
+                    self._send_message({'type': 'pong'})
+                    continue
+                # Only the first message carrying a request_id is the reply; any later one is a push
+                future = self.pending_requests.pop(message.get('request_id'), None)
+                if future is not None:
+                    future.set_result(message)
+                else:
+                    messages.append(message)
+            return messages
         except socket.error as e:
+            self._fail_pending_requests(e)
             raise ConnectionError(f"Error receiving response from server: {e}") from e
 
+    def _fail_pending_requests(self, error: Exception) -> None:
+        """
+        Fails every request still waiting for a reply once the connection is lost.
+        """
+        pending, self.pending_requests = self.pending_requests, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError(f"Connection lost before the reply arrived: {error}"))
+
     def _send_message(self, message: dict) -> None:
         """
         Encodes and sends a message to the server.
@@ -110,63 +277,109 @@ class Client:
         """
         try:
             encoded_message = self.protocol.encode_message(message)
-            self.socket.sendall(encoded_message)
+            with self._send_lock:
+                self.socket.sendall(encoded_message)
         except socket.error as e:
             raise ConnectionError(f"Failed to send message to server: {e}")
 
+    def listen(self) -> None:
+        """
+        Receives messages from the server until the connection closes, handling
+        replies and pushed notifications as they arrive. Runs alongside the
+        menu loop so pushes are seen without issuing a command first.
+        """
+        try:
+            while self.socket:
+                self.handle_server_message(self.receive_response())
+        except ConnectionError as e:
+            if self.socket:
+                print(f"Connection error: {e}")
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+
+    def handle_server_message(self, response: dict) -> None:
+        """
+        Handles a single message from the server, updating the client's state as needed.
+
+        Args:
+            response (dict): The decoded message from the server.
+        """
+        if response['type'] == 'opponents_list':
+            print(f"Available opponents: {response['opponents']}")
+            if response.get('next_offset') is not None:
+                print("More opponents are available, ask again to see the next page.")
+            self.opponents_offset = response.get('next_offset') or 0
+        elif response['type'] == 'match_queued':
+            print("Waiting for another player to find a match...")
+        elif response['type'] == 'match_cancelled':
+            print("Stopped waiting for a match.")
+        elif response['type'] == 'game_started':
+            self.game_id = response['game_id']
+            if response.get('player2') == self.client_id:
+                print(f"Game started with ID: {self.game_id}. {response.get('player1')} picked a word of "
+                      f"{response.get('word_length')} letters, start guessing!")
+            else:
+                print(f"Game started with ID: {self.game_id}. Waiting for {response.get('player2')} to guess your word.")
+        elif response['type'] == 'guess_result':
+            if response['result'] == True:
+                print("Congratulations, you have guessed the word!")
+            else:
+                print(f"Guess is not correct: {response.get('feedback')} "
+                      f"(H: right letter and place, P: letter elsewhere in the word, M: not in the word)")
+        elif response['type'] == 'guess_made':
+            print(f"Opponent guessed '{response['guess']}' (attempt {response['attempts']}): {response.get('feedback')}")
+        elif response['type'] == 'game_over':
+            print(f"Game {response['game_id']} is over after {response['attempts']} attempts ({response.get('reason')})")
+            if response['game_id'] == self.game_id:
+                self.game_id = None
+        elif response['type'] == 'hint_acknowledged':
+            print("Hint acknowledged")
+        elif response['type'] == 'hint_received':
+            print(f"Hint received: {response['hint']}")
+        elif response['type'] == 'error':
+            if 'retry_after' in response:
+                print(f"Error from server: {response['message']} (retry in {response['retry_after']}s)")
+            else:
+                print(f"Error from server: {response['message']}")
+        else:
+            print(f"Unknown response type: {response['type']}")
+
     def handle_server_response(self) -> None:
         """
-        Handles responses from the server, updating the client's state as needed.
+        Reads menu choices and sends the matching requests to the server. Responses
+        are handled by the listener thread started alongside this loop.
         """
+        listener = threading.Thread(target=self.listen, daemon=True)
+        listener.start()
         try:
-            while True:
+            while listener.is_alive():
                 self.display_menu()
-                choice = input("Enter your choice (1-5): ")
+                choice = input("Enter your choice (1-6): ")
 
                 if choice == "1":
-                    self.request_opponents_list()
+                    self.request_opponents_list(self.opponents_offset)
                 elif choice == "2":
                     opponentID = input("Enter opponent ID: ")
                     guessWord = input("Enter guess word: ")
 
                     self.start_game_with_opponent(opponentID, guessWord)
                 elif choice == "3":
+                    guessWord = input("Enter guess word: ")
+
+                    self.find_match(guessWord)
+                elif choice == "4":
                     guess = input("Enter guess: ")
 
                     self.send_guess(guess)
-                elif choice == "4":
+                elif choice == "5":
                     hint = input("Enter hint: ")
 
                     self.send_hint(hint)
-                elif choice == "5":
+                elif choice == "6":
                     print("Exiting the client application. Goodbye!")
                     break
                 else:
-                    print("Invalid choice. Please enter a number between 1 and 5.")
-                    continue
-
-                response = self.receive_response()
-                if response['type'] == 'opponents_list':
-                    print(f"Available opponents: {response['opponents']}")
-                elif response['type'] == 'game_started':
-                    self.game_id = response['game_id']
-                    print(f"Game started with ID: {self.game_id}")
-                elif response['type'] == 'guess_result':
-                    if response['result'] == True:
-                        print("Congratulations, you have guessed the word!")
-                        self.game_id = None
-                    else:
-                        print("Guess is not correct")
-                elif response['type'] == 'hint_acknowledged':
-                    print("Hint acknowledged")
-                elif response['type'] == 'hint_received':
-                    print(f"Hint received: {response['hint']}")
-                elif response['type'] == 'error':
-                    print(f"Error from server: {response['message']}")
-                else:
-                    print(f"Unknown response type: {response['type']}")
-
-                input("Press anything to continue...")
+                    print("Invalid choice. Please enter a number between 1 and 6.")
                 
         except ConnectionError as e:
             print(f"Connection error: {e}")
@@ -177,10 +390,11 @@ class Client:
         print(f"\n===== Menu {self.client_id}=====")
         print("1. Request Opponents List")
         print("2. Start Game with Opponent")
+        print("3. Find Match")
         if (self.game_id != None):
-            print("3. Send Guess")
-            print("4. Send Hint")
-        print("5. Quit")
+            print("4. Send Guess")
+            print("5. Send Hint")
+        print("6. Quit")
         print("=================\n")
 
     def start(self):
@@ -194,6 +408,7 @@ class Client:
             response = self.receive_response()
             if response['type'] == 'authentication_success':
                 self.client_id = response['client_id']
+                self.session_token = response.get('session_token')
                 print(f"Your IDS is: {self.client_id}")
 
                 self.handle_server_response()
@@ -204,14 +419,12 @@ class Client:
             self.disconnect()         
 
 if __name__ == "__main__":
-    # server_type = input("Enter server type (tcp/unix): ")
-    # if server_type != "tcp" and server_type != "unix":
-    #     print(f"Wrong server type selected.")
-    #     exit()
-    # server_address = input("Enter server address: ")
-    # server_port = int(input("Enter server port: "))
-    server_type = "tcp"
-    server_address = "localhost"
-    server_port = 12345
-    client = Client(server_type, server_address, server_port)
+    parser = argparse.ArgumentParser(description="Interactive client for the word guessing game server.")
+    parser.add_argument('--type', choices=('tcp', 'unix'), default='tcp', help="The transport to connect over.")
+    parser.add_argument('--host', default='localhost', help="The server's hostname.")
+    parser.add_argument('--port', type=int, default=12345, help="The server's TCP port.")
+    parser.add_argument('--socket-path', default='/tmp/game_server.sock', help="The server's UNIX socket path.")
+    args = parser.parse_args()
+    server_address = args.socket_path if args.type == 'unix' else args.host
+    client = Client(args.type, server_address, args.port)
     client.start()
\ No newline at end of file
@@ -0,0 +1,43 @@
+## config.py
+import os
+from typing import Optional
+
+# The bcrypt hash of the development password 'securepassword'. Hashes are
+# computed once, ahead of time (run this module to make one), so starting a
+# server never pays for bcrypt's key stretching.
+DEFAULT_PASSWORD_HASH = b'$2b$12$W3ia1rxywirKjD5EEM1FrePwSnH7EqCGHlvcry0gQQjJjoCIH14pO'
+
+# Environment variable holding the password hash, for deployments that do not pass a file
+PASSWORD_HASH_ENV = 'WORDGAME_PASSWORD_HASH'
+
+def load_password_hash(path: Optional[str] = None) -> bytes:
+    """
+    Loads the bcrypt hash client passwords are checked against: from a file
+    if a path is given, otherwise from the WORDGAME_PASSWORD_HASH environment
+    variable, otherwise the development default.
+
+    Args:
+        path (Optional[str]): A file containing the hash.
+
+    Returns:
+        bytes: The bcrypt hash.
+
+    Raises:
+        ValueError: If the configured value is not a bcrypt hash.
+    """
+    if path is not None:
+        with open(path, 'rb') as file:
+            hashed_password = file.read().strip()
+    elif os.environ.get(PASSWORD_HASH_ENV):
+        hashed_password = os.environ[PASSWORD_HASH_ENV].strip().encode('ascii')
+    else:
+        return DEFAULT_PASSWORD_HASH
+    if not hashed_password.startswith(b'$2') or len(hashed_password) != 60:
+        raise ValueError("The configured password hash is not a bcrypt hash")
+    return hashed_password
+
+# Prints the hash of a password to configure a server with
+if __name__ == "__main__":
+    import getpass
+    import bcrypt
+    print(bcrypt.hashpw(getpass.getpass("Password: ").encode('utf-8'), bcrypt.gensalt()).decode('ascii'))
@@ -0,0 +1,132 @@
+## connection.py
+import selectors
+import socket
+import time
+from collections import deque
+from itertools import islice
+from typing import Optional
+from protocol import FrameDecoder, Protocol
+
+class Connection:
+    """
+    The Connection class holds the per-socket state the server's event loop
+    needs to serve a single client: the socket itself, the peer address, the
+    client identifier assigned on authentication, the protocol carrying the
+    codec negotiated for this client, the incremental decoder for incoming
+    frames and the queue of outgoing frames not written yet.
+
+    Outgoing frames are queued as they are produced and written together,
+    up to MAX_FRAMES_PER_SEND per sendmsg() call, so a burst of replies
+    costs one system call instead of one each. The queue can be bounded so a
+    client that stops reading cannot make the server buffer without limit.
+    """
+
+    MAX_FRAMES_PER_SEND = 256  # Well below IOV_MAX, the kernel's limit on buffers per sendmsg()
+
+    __slots__ = ('socket', 'address', 'client_id', 'auth_attempts', 'auth_pending', 'protocol', 'decoder',
+                 'outgoing', 'outgoing_bytes', 'max_outgoing_bytes', 'overflowed', 'events',
+                 'last_received', 'partial_since', 'ping_sent', 'liveness_timer', 'rate_limits', 'close_when_flushed', 'closed')
+
+    def __init__(self, client_socket: socket.socket, address, max_outgoing_bytes: Optional[int] = None):
+        """
+        Initializes the connection state for an accepted client socket.
+
+        Args:
+            client_socket (socket.socket): The accepted, non-blocking client socket.
+            address: The peer address returned by accept().
+            max_outgoing_bytes (Optional[int]): The most bytes queued for sending at once, or None for no limit.
+        """
+        self.socket = client_socket
+        self.address = address
+        self.client_id = None
+        self.auth_attempts = 0
+        self.auth_pending = False
+        self.protocol = Protocol()
+        self.decoder = FrameDecoder(self.protocol)
+        self.outgoing = deque()  # Encoded frames, or what is left of them, oldest first
+        self.outgoing_bytes = 0
+        self.max_outgoing_bytes = max_outgoing_bytes
+        self.overflowed = False  # Set by the server when it gives up on a client that stopped reading
+        self.events = selectors.EVENT_READ  # The events the selector is watching for
+        self.last_received = time.monotonic()  # When the client last sent anything
+        self.partial_since = None  # When the incomplete frame at the front of the decoder started arriving
+        self.ping_sent = False  # Whether a heartbeat went unanswered since the client last sent anything
+        self.liveness_timer = None  # The server's next check for a dead or stalled client
+        self.rate_limits = {}  # message type: TokenBucket, filled in by the server's RateLimiter
+        self.close_when_flushed = False
+        self.closed = False
+
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
+    def peer_host(self) -> str:
+        """
+        Returns the host part of the peer address, used to rate limit per host.
+        """
+        if isinstance(self.address, tuple):
+            return self.address[0]
+        # UNIX domain peers are usually unnamed; they all count as the local host
+        return str(self.address) or 'localhost'
+
+    def received(self, decoded_messages: bool) -> None:
+        """
+        Records that data arrived, for the server's idle and read timeouts.
+
+        Args:
+            decoded_messages (bool): Whether the data completed at least one frame.
+        """
+        now = self.last_received = time.monotonic()
+        self.ping_sent = False
+        if not self.decoder.pending_bytes():
+            self.partial_since = None
+        elif decoded_messages or self.partial_since is None:
+            # Whatever is left over is the start of a new frame
+            self.partial_since = now
+
+    def queue(self, frame: bytes) -> bool:
+        """
+        Queues an encoded frame for sending, unless that would exceed max_outgoing_bytes.
+
+        Args:
+            frame (bytes): The encoded frame.
+
+        Returns:
+            bool: True if the frame was queued, False if the queue is full.
+        """
+        if self.max_outgoing_bytes is not None and self.outgoing_bytes + len(frame) > self.max_outgoing_bytes:
+            return False
+        self.outgoing.append(frame)
+        self.outgoing_bytes += len(frame)
+        return True
+
+    def flush(self) -> tuple:
+        """
+        Writes as many queued frames as the socket accepts without blocking,
+        several frames per system call.
+
+        Returns:
+            tuple: (True if the queue is now empty, list of the number of frames offered to each sendmsg() call).
+        """
+        outgoing = self.outgoing
+        batches = []
+        while outgoing:
+            frames = list(islice(outgoing, self.MAX_FRAMES_PER_SEND))
+            try:
+                sent = self.socket.sendmsg(frames)
+            except (BlockingIOError, InterruptedError):
+                return False, batches
+            batches.append(len(frames))
+            self.outgoing_bytes -= sent
+            remaining = sent
+            while remaining:
+                frame = outgoing[0]
+                if remaining < len(frame):
+                    # Keep the unsent tail without copying it
+                    outgoing[0] = memoryview(frame)[remaining:]
+                    break
+                outgoing.popleft()
+                remaining -= len(frame)
+            if sent < sum(len(frame) for frame in frames):
+                # The socket buffer is full; wait for it to become writable again
+                return False, batches
+        return True, batches
@@ -0,0 +1,54 @@
+## dictionary.py
+from typing import Iterable
+
+class Dictionary:
+    """
+    The Dictionary class holds the words players may guess. Words are kept
+    casefolded in one set per length, so checking a guess is a single hash
+    lookup in the set for its length and a server can hold a large word list
+    without scanning it.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        """
+        Initializes a dictionary.
+
+        Args:
+            words (Iterable[str]): The valid words; anything that is not purely alphabetic is skipped.
+        """
+        self._words = {}  # word length: set of casefolded words
+        for word in words:
+            self.add(word)
+
+    @classmethod
+    def load(cls, path: str) -> 'Dictionary':
+        """
+        Loads a word list with one word per line, such as /usr/share/dict/words.
+
+        Args:
+            path (str): The path of the word list.
+
+        Returns:
+            Dictionary: The loaded dictionary.
+        """
+        with open(path, encoding='utf-8') as file:
+            return cls(line.strip() for line in file)
+
+    def add(self, word: str) -> None:
+        """
+        Adds a word.
+
+        Args:
+            word (str): The word to add.
+        """
+        if word.isalpha():
+            word = word.casefold()
+            self._words.setdefault(len(word), set()).add(word)
+
+    def __contains__(self, word: str) -> bool:
+        word = word.casefold()
+        words = self._words.get(len(word))
+        return words is not None and word in words
+
+    def __len__(self) -> int:
+        return sum(len(words) for words in self._words.values())
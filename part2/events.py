@@ -0,0 +1,138 @@
+## events.py
+import json
+import threading
+from collections import deque
+
+ALL_GAMES = '*'
+
+class GameEvent:
+    """
+    The GameEvent class wraps one published event. It is shared by every
+    subscriber that receives it, so its Server-Sent Events frame is encoded
+    once no matter how many spectators are watching.
+    """
+
+    __slots__ = ('topic', 'data', '_frame')
+
+    def __init__(self, topic: str, data: dict):
+        self.topic = topic
+        self.data = data
+        self._frame = None
+
+    @property
+    def frame(self) -> bytes:
+        """
+        Returns the event encoded as a Server-Sent Events frame.
+        """
+        frame = self._frame
+        if frame is None:
+            frame = self._frame = f"event: {self.data['type']}\ndata: {json.dumps(self.data)}\n\n".encode('utf-8')
+        return frame
+
+
+class Subscription:
+    """
+    The Subscription class is one subscriber's bounded inbox. When a slow
+    subscriber falls more than max_pending events behind, the oldest events
+    are dropped rather than letting memory grow.
+    """
+
+    def __init__(self, topic: str, max_pending: int):
+        self.topic = topic
+        self.dropped = 0
+        self._pending = deque(maxlen=max_pending)
+        self._ready = threading.Event()
+
+    def put(self, event: GameEvent) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(event)
+        self._ready.set()
+
+    def get(self, timeout: float) -> list:
+        """
+        Waits up to timeout seconds for events and returns all that are pending.
+
+        Args:
+            timeout (float): The longest time to wait, in seconds.
+
+        Returns:
+            list: The pending events in publication order, empty if the wait timed out.
+        """
+        # Clearing before draining means an event published meanwhile sets it again
+        self._ready.clear()
+        if not self._pending:
+            self._ready.wait(timeout)
+        events = []
+        while self._pending:
+            events.append(self._pending.popleft())
+        return events
+
+
+class EventBus:
+    """
+    The EventBus class is an in-process publish/subscribe hub for game events.
+    The game server publishes to a game's topic and the web interface
+    subscribes either to a single game or to ALL_GAMES. Publishing is safe
+    from any thread and costs one append per subscriber.
+    """
+
+    def __init__(self, max_pending: int = 256):
+        """
+        Initializes a bus without subscribers.
+
+        Args:
+            max_pending (int): How many undelivered events each subscriber may hold.
+        """
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self._subscribers = {}  # topic: set of Subscription
+
+    def subscribe(self, topic: str = ALL_GAMES) -> Subscription:
+        """
+        Starts receiving the events of a topic.
+
+        Args:
+            topic (str): A game_id, or ALL_GAMES for the events of every game.
+
+        Returns:
+            Subscription: The inbox the events are delivered to.
+        """
+        subscription = Subscription(topic, self.max_pending)
+        with self.lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Stops delivering events to a subscription.
+
+        Args:
+            subscription (Subscription): The subscription returned by subscribe().
+        """
+        with self.lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def publish(self, topic: str, data: dict) -> None:
+        """
+        Delivers an event to the subscribers of its topic and of ALL_GAMES.
+
+        Args:
+            topic (str): The game_id the event belongs to.
+            data (dict): The event; it must contain a 'type' and must not be modified afterwards.
+        """
+        if not self._subscribers:
+            return
+        event = GameEvent(topic, data)
+        with self.lock:
+            subscribers = list(self._subscribers.get(topic, ())) + list(self._subscribers.get(ALL_GAMES, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscriber_count(self) -> int:
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
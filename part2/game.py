@@ -1,16 +1,57 @@
 ## game.py
+import sys
+import time
+from enum import IntEnum
+from typing import Optional
+
+class GameState(IntEnum):
+    """
+    The lifecycle states of a game.
+    """
+    WAITING = 0
+    ACTIVE = 1
+    GUESSED = 2
+    ABANDONED = 3
+    EXPIRED = 4
+
+
 class Game:
     """
     The Game class represents a game session between two players. It manages the game state,
     including the word to be guessed, hints provided, and the number of attempts made.
+
+    Games are slotted and keep only what is needed to play: the word is stored
+    once, already casefolded for comparison, player IDs are interned so every
+    game shares the same string objects, and only the most recent MAX_HINTS
+    hints are kept in a ring buffer.
+
+    Guesses are scored Wordle-style: each letter of the feedback is HIT when
+    the guessed letter is in the right place, PRESENT when the word has it
+    elsewhere and MISS otherwise, with repeated letters only matched as many
+    times as the word contains them. The word's letter counts are built on
+    the first guess and reused for every later one.
     """
 
+    MAX_HINTS = 32
+    # Longest hint accepted, so a player cannot make every snapshot and push carry a huge string
+    MAX_HINT_LENGTH = 64
+    HIT = 'H'
+    PRESENT = 'P'
+    MISS = 'M'
+
+    __slots__ = ('word', 'player1', 'player2', 'attempts', 'state', 'last_activity', '_hints', '_hint_count',
+                 '_letter_counts')
+
     def __init__(self):
         self.word = ""
-        self.hints = []
         self.attempts = 0
         self.player1 = ""
         self.player2 = ""
+        self.state = GameState.WAITING
+        self.last_activity = time.monotonic()
+        self._hints = None  # Allocated on the first hint
+        self._hint_count = 0
+        self._letter_counts = None  # letter: occurrences in the word, built on the first guess
 
     def start_game(self, player1:str, player2: str, word: str) -> None:
         """
@@ -21,33 +62,142 @@ class Game:
             player2 (str): The identifier of the opponent player.
             word (str): The word to be guessed by the opponent.
         """
-        self.player1 = player1
-        self.player2 = player2
-        self.word = word
-        self.hints = []
+        self.player1 = sys.intern(player1)
+        self.player2 = sys.intern(player2)
+        self.word = word.casefold()
         self.attempts = 0
+        self.state = GameState.ACTIVE
+        self.last_activity = time.monotonic()
+        self._hints = None
+        self._hint_count = 0
+        self._letter_counts = None
+
+    @classmethod
+    def restore(cls, player1: str, player2: str, word: str, attempts: int, hints: list, hint_count: int) -> 'Game':
+        """
+        Rebuilds an active game from persisted state.
+
+        Args:
+            player1 (str): The identifier of the player that initiated the game.
+            player2 (str): The identifier of the opponent player.
+            word (str): The word to be guessed.
+            attempts (int): The number of guesses made so far.
+            hints (list): The hints given so far, oldest first; only the last MAX_HINTS are kept.
+            hint_count (int): How many hints were given in total.
+
+        Returns:
+            Game: The restored game, active again.
+        """
+        game = cls()
+        game.start_game(player1, player2, word)
+        game.attempts = attempts
+        hints = hints[-cls.MAX_HINTS:]
+        if hint_count > cls.MAX_HINTS:
+            # Put every hint back in the ring buffer slot add_hint would have used
+            game._hints = [None] * cls.MAX_HINTS
+            for index, hint in enumerate(hints, hint_count - len(hints)):
+                game._hints[index % cls.MAX_HINTS] = hint
+        elif hints:
+            game._hints = list(hints)
+        game._hint_count = hint_count
+        return game
 
     def get_opponent(self) -> str:
         return self.player2
 
-    def guess_word(self, guess: str) -> bool:
+    @property
+    def word_length(self) -> int:
+        return len(self.word)
+
+    def check_guess(self, guess) -> Optional[str]:
+        """
+        Checks that a guess could be the word at all, without counting it as an attempt.
+
+        Args:
+            guess: The guess as received from the client.
+
+        Returns:
+            Optional[str]: Why the guess is rejected, or None if it is acceptable.
+        """
+        if not isinstance(guess, str) or not guess.isalpha():
+            return 'Guesses must be words made of letters'
+        if len(guess.casefold()) != len(self.word):
+            return f"Guesses must have {len(self.word)} letters"
+        return None
+
+    def score_guess(self, guess: str) -> str:
         """
-        Allows the opponent to guess the word and increments the attempt count.
+        Counts a guess as an attempt and scores it letter by letter. The guess
+        must have passed check_guess.
 
         Args:
             guess (str): The opponent's guess for the word.
 
         Returns:
-            bool: True if the guess is correct, False otherwise.
+            str: One of HIT, PRESENT or MISS per letter; all HIT means the word was guessed.
         """
         self.attempts += 1
-        return guess.lower() == self.word.lower()
+        self.last_activity = time.monotonic()
+        guess = guess.casefold()
+        word = self.word
+        if guess == word:
+            return self.HIT * len(word)
+        if self._letter_counts is None:
+            counts = {}
+            for letter in word:
+                counts[letter] = counts.get(letter, 0) + 1
+            self._letter_counts = counts
+        # Letters in the right place use up their occurrences before misplaced ones are matched
+        remaining = self._letter_counts.copy()
+        feedback = [self.MISS] * len(word)
+        for index, letter in enumerate(guess):
+            if letter == word[index]:
+                feedback[index] = self.HIT
+                remaining[letter] -= 1
+        for index, letter in enumerate(guess):
+            if feedback[index] == self.MISS and remaining.get(letter, 0) > 0:
+                feedback[index] = self.PRESENT
+                remaining[letter] -= 1
+        return ''.join(feedback)
 
-    def add_hint(self, hint: str) -> None:
+    def add_hint(self, hint) -> Optional[str]:
         """
-        Adds a hint to the game to help the opponent guess the word.
+        Adds a hint to the game to help the opponent guess the word. Once
+        MAX_HINTS hints are stored, each new hint replaces the oldest one.
 
         Args:
-            hint (str): A hint to help the opponent guess the word.
+            hint: The hint as received from the player.
+
+        Returns:
+            Optional[str]: Why the hint is rejected, or None if it was added.
+        """
+        if not isinstance(hint, str) or not hint.strip():
+            return 'Hints must be text'
+        if len(hint) > self.MAX_HINT_LENGTH:
+            return f"Hints can have at most {self.MAX_HINT_LENGTH} characters"
+        if self._hints is None:
+            self._hints = []
+        if len(self._hints) < self.MAX_HINTS:
+            self._hints.append(hint)
+        else:
+            self._hints[self._hint_count % self.MAX_HINTS] = hint
+        self._hint_count += 1
+        self.last_activity = time.monotonic()
+        return None
+
+    @property
+    def hints(self) -> list:
+        """
+        Returns the stored hints, oldest first.
+        """
+        if self._hints is None:
+            return []
+        start = self._hint_count % self.MAX_HINTS if self._hint_count > self.MAX_HINTS else 0
+        return self._hints[start:] + self._hints[:start]
+
+    @property
+    def hint_count(self) -> int:
+        """
+        Returns how many hints were added in total, including ones no longer stored.
         """
-        self.hints.append(hint)
+        return self._hint_count
@@ -1,39 +1,161 @@
+import argparse
 import threading
+import metrics
+from config import load_password_hash
+from dictionary import Dictionary
+from persistence import GameStore
+from ratelimit import RateLimiter
 from server import Server
-from web_interface import WebInterface
+from workers import WorkerPool
+
+def create_web_interface(server: Server):
+    """
+    Builds the web interface for a server. Flask is only imported here, so
+    running without the web interface never loads it.
+
+    Args:
+        server (Server): The game server whose games the web interface shows.
+
+    Returns:
+        WebInterface: The web interface, not yet running.
+    """
+    from web_interface import WebInterface
+
+    # The web interface reads the snapshots the server publishes on every change,
+    # so serving a GET never touches a live Game or takes a lock
+    get_game_data_callback = server.snapshots.get
+
+    # Hints from the web are applied under the game's lock and pushed to the guessing player
+    update_game_data_callback = server.add_hint_from_web
+
+    # Spectators stream the events the server publishes instead of polling
+    event_bus = server.events
+
+    # Batch endpoints resolve many games or hints with one call each
+    get_many_games_callback = server.snapshots.get_many
+    list_active_games_callback = server.snapshots.list_active
+    update_many_games_callback = server.add_hints_from_web
+
+    # /metrics renders every counter, gauge and histogram of the process
+    render_metrics_callback = metrics.REGISTRY.render
+
+    # Instantiate the WebInterface with callbacks
+    web_interface = WebInterface(get_game_data_callback, update_game_data_callback, event_bus,
+                                 get_many_games_callback, list_active_games_callback, update_many_games_callback,
+                                 render_metrics_callback)
+    return web_interface
 
 # Define the main function to start the server and the web interface
 def main():
-    # Instantiate the Server
-    server = Server()
-
-    # Define callback functions for the WebInterface
-    def get_game_data_callback(game_id):
-        if game_id in server.games:
-            game = server.games[game_id]
-            return {
-                'word': game.word,
-                'hints': game.hints,
-                'attempts': game.attempts
-            }
-        return None
-
-    def update_game_data_callback(game_id, hint):
-        if game_id in server.games:
-            game = server.games[game_id]
-            game.add_hint(hint)
-            return True
-        return False
+    parser = argparse.ArgumentParser(description="Runs the game server and its web interface.")
+    parser.add_argument('--host', default='localhost', help="The hostname the game server listens on.")
+    parser.add_argument('--port', type=int, default=12345, help="The port the game server listens on.")
+    parser.add_argument('--unix-socket', default='/tmp/game_server.sock', metavar='PATH',
+                        help="Also listen on this UNIX domain socket; pass an empty path to listen on TCP only.")
+    parser.add_argument('--web-port', type=int, default=5000, help="The port the web interface listens on.")
+    parser.add_argument('--no-web', action='store_true',
+                        help="Run only the game server, without loading or starting the web interface.")
+    parser.add_argument('--web-workers', type=int, default=8, help="Threads serving ordinary web requests.")
+    parser.add_argument('--web-max-streams', type=int, default=64,
+                        help="The most web event streams open at once; each is served on a thread of its own.")
+    parser.add_argument('--password-hash-file', metavar='PATH',
+                        help="Read the bcrypt hash of the client password from PATH instead of $WORDGAME_PASSWORD_HASH.")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Sample the server's event loop and write collapsed stacks to PATH on exit.")
+    parser.add_argument('--profile-interval', type=float, default=0.005, help="Seconds between profiler samples.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Serve games from this many processes sharing the port. The web interface is disabled when above 1.")
+    parser.add_argument('--data-dir', metavar='PATH',
+                        help="Persist games and sessions in PATH and restore them on start.")
+    parser.add_argument('--snapshot-interval', type=float, default=300.0,
+                        help="Seconds between snapshots of the persisted state.")
+    parser.add_argument('--fsync-interval', type=float, default=1.0,
+                        help="Seconds between fsyncs of the persisted log: 0 fsyncs every write, "
+                             "a negative value leaves flushing to the operating system.")
+    parser.add_argument('--max-outgoing-bytes', type=int, default=1 << 20,
+                        help="The most bytes queued for one client before slow client handling applies.")
+    parser.add_argument('--slow-client-policy', choices=Server.SLOW_CLIENT_POLICIES, default='disconnect',
+                        help="Disconnect a client whose send queue is full, or drop the messages that do not fit.")
+    parser.add_argument('--heartbeat-interval', type=float, default=30.0,
+                        help="Seconds of silence after which a client is pinged.")
+    parser.add_argument('--idle-timeout', type=float, default=90.0,
+                        help="Seconds of silence after which a client is disconnected and its game ended.")
+    parser.add_argument('--read-timeout', type=float, default=15.0,
+                        help="Seconds a client may take to finish sending a message it has started.")
+    parser.add_argument('--dictionary', metavar='PATH',
+                        help="Only accept words and guesses from this word list, one word per line.")
+    parser.add_argument('--rate-limit', action='append', default=[], metavar='TYPE=RATE/BURST',
+                        help="Limit each client to RATE messages of TYPE per second, in bursts of up to BURST. Repeatable.")
+    parser.add_argument('--no-rate-limits', action='store_true', help="Do not rate limit client messages.")
+    parser.add_argument('--max-messages-per-iteration', type=int, default=2048,
+                        help="The most client messages handled per event loop iteration; more are refused as busy. 0 for no limit.")
+    args = parser.parse_args()
+    try:
+        password_hash = load_password_hash(args.password_hash_file)
+    except (OSError, ValueError) as e:
+        parser.error(f"Cannot load the password hash: {e}")
+    server_options = {'host': args.host, 'port': args.port, 'password_hash': password_hash,
+                      'max_outgoing_bytes': args.max_outgoing_bytes, 'slow_client_policy': args.slow_client_policy,
+                      'heartbeat_interval': args.heartbeat_interval, 'idle_timeout': args.idle_timeout,
+                      'read_timeout': args.read_timeout,
+                      'max_messages_per_iteration': args.max_messages_per_iteration or None}
+    if args.no_rate_limits:
+        server_options['rate_limits'] = False
+    elif args.rate_limit:
+        limits = {}
+        for limit in args.rate_limit:
+            try:
+                message_type, rate = limit.split('=')
+                rate, burst = rate.split('/')
+                limits[message_type] = (float(rate), int(burst))
+            except ValueError:
+                parser.error(f"--rate-limit expects TYPE=RATE/BURST, got {limit!r}")
+        server_options['rate_limiter'] = RateLimiter(limits)
+    if args.dictionary:
+        server_options['dictionary'] = Dictionary.load(args.dictionary)
+        print(f"Loaded {len(server_options['dictionary'])} words from {args.dictionary}")
 
-    # Instantiate the WebInterface with callbacks
-    web_interface = WebInterface(get_game_data_callback, update_game_data_callback)
+    if args.workers > 1 and args.data_dir:
+        parser.error("--data-dir is not supported with more than one worker")
+
+    if args.workers > 1:
+        print(f"Starting {args.workers} worker processes; the web interface and the UNIX socket are not available in this mode")
+        WorkerPool(args.workers, **server_options).run()
+        return
+
+    # Instantiate the Server, restoring the games of an earlier run if a data directory is given
+    store = None
+    if args.data_dir:
+        fsync_interval = args.fsync_interval if args.fsync_interval >= 0 else None
+        store = GameStore(args.data_dir, fsync_interval=fsync_interval, snapshot_interval=args.snapshot_interval)
+    server = Server(store=store, unix_socket_path=args.unix_socket or None, **server_options)
 
     # Start the server in a separate thread
     server_thread = threading.Thread(target=server.start_server)
     server_thread.start()
 
-    # Start the web interface
-    web_interface.run()
+    profiler = None
+    if args.profile:
+        profiler = metrics.SamplingProfiler(server_thread.ident, args.profile_interval)
+        profiler.start()
+
+    web_interface = None
+    try:
+        if args.no_web:
+            # Wake up now and then so Ctrl+C is noticed
+            while server_thread.is_alive():
+                server_thread.join(0.5)
+        else:
+            web_interface = create_web_interface(server)
+            web_interface.run(port=args.web_port, workers=args.web_workers, max_streams=args.web_max_streams)
+    finally:
+        if web_interface:
+            # Ends open event streams, which would otherwise keep writing keepalives
+            web_interface.shutdown()
+        if profiler:
+            profiler.stop()
+            profiler.write(args.profile)
+        server.stop_server()
 
 # Check if the script is run directly
 if __name__ == "__main__":
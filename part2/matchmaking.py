@@ -0,0 +1,107 @@
+## matchmaking.py
+from collections import OrderedDict
+from itertools import islice
+from typing import Optional
+
+class Matchmaker:
+    """
+    The Matchmaker class keeps an index of authenticated players that are not
+    in a game, in the order they became available, and a FIFO queue of
+    players waiting to be paired automatically. Every update is O(1) and
+    pairing two waiting players never scans the connected players.
+    It is only used from the server's event loop thread.
+    """
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+
+    def __init__(self):
+        self._available = OrderedDict()  # client_id: None, oldest first
+        self._waiting = OrderedDict()  # client_id: word to guess, oldest first
+
+    def set_available(self, client_id: str) -> None:
+        """
+        Marks a player as free to be challenged.
+
+        Args:
+            client_id (str): The identifier of the player.
+        """
+        self._available[client_id] = None
+
+    def set_busy(self, client_id: str) -> None:
+        """
+        Removes a player that started a game from the index and the waiting queue.
+
+        Args:
+            client_id (str): The identifier of the player.
+        """
+        self._available.pop(client_id, None)
+        self._waiting.pop(client_id, None)
+
+    def remove(self, client_id: str) -> None:
+        """
+        Forgets a player that disconnected.
+
+        Args:
+            client_id (str): The identifier of the player.
+        """
+        self.set_busy(client_id)
+
+    def is_available(self, client_id: str) -> bool:
+        return client_id in self._available
+
+    def list_available(self, exclude: Optional[str] = None, offset: int = 0,
+                       limit: int = DEFAULT_PAGE_SIZE, prefix: str = '') -> tuple:
+        """
+        Returns one page of available players.
+
+        Args:
+            exclude (Optional[str]): A player to leave out, normally the one asking.
+            offset (int): The number of matching players to skip.
+            limit (int): The largest page to return, capped at MAX_PAGE_SIZE.
+            prefix (str): Only list players whose identifier starts with this prefix.
+
+        Returns:
+            tuple: (list of client identifiers, offset of the next page or None if this is the last one).
+        """
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        offset = max(0, offset)
+        candidates = (client_id for client_id in self._available
+                      if client_id != exclude and client_id.startswith(prefix))
+        # One extra element tells whether another page follows
+        page = list(islice(candidates, offset, offset + limit + 1))
+        if len(page) > limit:
+            return page[:limit], offset + limit
+        return page, None
+
+    def enqueue(self, client_id: str, word: str) -> Optional[tuple]:
+        """
+        Pairs a player with the longest waiting one, or queues them if nobody is waiting.
+
+        Args:
+            client_id (str): The identifier of the player looking for a match.
+            word (str): The word this player wants the opponent to guess.
+
+        Returns:
+            Optional[tuple]: (waiting client_id, their word) if a match was found, None if the player was queued.
+        """
+        self._waiting.pop(client_id, None)
+        if self._waiting:
+            return self._waiting.popitem(last=False)
+        self._waiting[client_id] = word
+        return None
+
+    def cancel(self, client_id: str) -> bool:
+        """
+        Takes a player out of the waiting queue.
+
+        Args:
+            client_id (str): The identifier of the player.
+
+        Returns:
+            bool: True if the player was waiting, False otherwise.
+        """
+        return self._waiting.pop(client_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._available)
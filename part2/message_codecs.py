@@ -0,0 +1,240 @@
+## message_codecs.py
+import json
+import struct
+from typing import Optional
+
+class JsonCodec:
+    """
+    The JsonCodec class serializes messages as UTF-8 encoded JSON objects.
+    It is the default codec and the one used until a codec is negotiated.
+    """
+
+    name = 'json'
+
+    def encode(self, message: dict) -> bytes:
+        """
+        Encodes a message into a JSON payload.
+
+        Args:
+            message (dict): The message to encode.
+
+        Returns:
+            bytes: The encoded payload.
+        """
+        try:
+            return json.dumps(message, separators=(',', ':')).encode('utf-8')
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Error encoding message to JSON: {e}")
+
+    def decode(self, payload) -> dict:
+        """
+        Decodes a JSON payload into a message.
+
+        Args:
+            payload (bytes | memoryview): The payload to decode.
+
+        Returns:
+            dict: The decoded message.
+        """
+        try:
+            # str() decodes straight from the buffer, so memoryview slices are never copied to bytes
+            message = json.loads(str(payload, 'utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError(f"Error decoding message from JSON: {e}")
+        if not isinstance(message, dict):
+            raise ValueError("Decoded message is not an object.")
+        return message
+
+
+class BinaryCodec:
+    """
+    The BinaryCodec class serializes the hot message types with a one byte
+    type tag followed by a fixed field layout: booleans take one byte,
+    integers are unsigned 32 bit and strings are prefixed with their length
+    as an unsigned 16 bit integer. Any message that does not match one of
+    the layouts exactly is sent as the generic tag followed by its JSON
+    encoding, so new message types and fields keep working before a layout
+    is added for them.
+
+    A message carrying an integer request_id, as requests and their replies
+    may, keeps its layout: the tag gets its high bit set and the request_id
+    follows it as an unsigned 32 bit integer.
+
+    Payloads starting with '{' are plain JSON, which lets a peer keep
+    decoding messages that were sent just before the codec was switched.
+    """
+
+    name = 'binary'
+
+    GENERIC_TAG = 0x00
+    REQUEST_ID_FLAG = 0x80
+    JSON_MARKER = ord('{')
+    LENGTH = struct.Struct('>H')
+    INTEGER = struct.Struct('>I')
+
+    # tag: (message type, ((field name, field kind), ...))
+    LAYOUTS = {
+        0x01: ('guess_result', (('result', bool), ('feedback', str))),
+        0x02: ('hint_acknowledged', ()),
+        0x03: ('guess', (('guess', str), ('game_id', str))),
+        0x04: ('hint', (('hint', str), ('game_id', str))),
+        0x05: ('hint_received', (('hint', str),)),
+        0x06: ('request_opponents', ()),
+        0x07: ('game_started', (('game_id', str), ('player1', str), ('player2', str), ('word_length', int))),
+        0x08: ('error', (('message', str),)),
+        0x09: ('guess_made', (('game_id', str), ('guess', str), ('attempts', int), ('feedback', str))),
+        0x0A: ('game_over', (('game_id', str), ('attempts', int), ('reason', str))),
+        0x0B: ('ping', ()),
+        0x0C: ('pong', ()),
+    }
+
+    def __init__(self):
+        self._json = JsonCodec()
+        self._tags = {message_type: (bytes((tag,)), bytes((tag | self.REQUEST_ID_FLAG,)), fields,
+                                     {'type', *(name for name, _ in fields)},
+                                     {'type', 'request_id', *(name for name, _ in fields)})
+                      for tag, (message_type, fields) in self.LAYOUTS.items()}
+
+    def encode(self, message: dict) -> bytes:
+        """
+        Encodes a message with its fixed layout, or generically if it has none.
+
+        Args:
+            message (dict): The message to encode.
+
+        Returns:
+            bytes: The encoded payload.
+        """
+        layout = self._tags.get(message.get('type'))
+        parts = self._header(message, layout) if layout is not None else None
+        if parts is not None:
+            for name, kind in layout[2]:
+                value = message[name]
+                if type(value) is not kind:
+                    break
+                if kind is bool:
+                    parts.append(b'\x01' if value else b'\x00')
+                elif kind is int:
+                    if not 0 <= value <= 0xFFFFFFFF:
+                        break
+                    parts.append(self.INTEGER.pack(value))
+                else:
+                    data = value.encode('utf-8')
+                    if len(data) > 0xFFFF:
+                        break
+                    parts.append(self.LENGTH.pack(len(data)))
+                    parts.append(data)
+            else:
+                return b''.join(parts)
+        return bytes((self.GENERIC_TAG,)) + self._json.encode(message)
+
+    def _header(self, message: dict, layout: tuple) -> Optional[list]:
+        """
+        Starts the encoding of a message whose fields are exactly those of its
+        layout, optionally plus an integer request_id.
+
+        Returns:
+            Optional[list]: The tag and request_id parts, or None if the message does not fit the layout.
+        """
+        tag, tag_with_request_id, _, keys, keys_with_request_id = layout
+        if message.keys() == keys:
+            return [tag]
+        request_id = message.get('request_id')
+        if message.keys() == keys_with_request_id and type(request_id) is int and 0 <= request_id <= 0xFFFFFFFF:
+            return [tag_with_request_id, self.INTEGER.pack(request_id)]
+        return None
+
+    def decode(self, payload) -> dict:
+        """
+        Decodes a tagged binary payload into a message.
+
+        Args:
+            payload (bytes | memoryview): The payload to decode.
+
+        Returns:
+            dict: The decoded message.
+        """
+        if not len(payload):
+            raise ValueError("Binary message is empty.")
+        tag = payload[0]
+        if tag == self.JSON_MARKER:
+            return self._json.decode(payload)
+        if tag == self.GENERIC_TAG:
+            return self._json.decode(payload[1:])
+        layout = self.LAYOUTS.get(tag & ~self.REQUEST_ID_FLAG)
+        if layout is None:
+            raise ValueError(f"Unknown binary message tag: {tag}")
+
+        message_type, fields = layout
+        message = {'type': message_type}
+        offset = 1
+        try:
+            if tag & self.REQUEST_ID_FLAG:
+                message['request_id'], = self.INTEGER.unpack_from(payload, offset)
+                offset += self.INTEGER.size
+            for name, kind in fields:
+                if kind is bool:
+                    message[name] = payload[offset] != 0
+                    offset += 1
+                elif kind is int:
+                    message[name], = self.INTEGER.unpack_from(payload, offset)
+                    offset += self.INTEGER.size
+                else:
+                    length, = self.LENGTH.unpack_from(payload, offset)
+                    offset += self.LENGTH.size
+                    if offset + length > len(payload):
+                        raise ValueError("Binary string field is truncated.")
+                    message[name] = str(payload[offset:offset + length], 'utf-8')
+                    offset += length
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Error decoding binary message: {e}")
+        if offset != len(payload):
+            raise ValueError("Binary message is longer than its layout.")
+        return message
+
+
+CODECS = {}  # codec name: codec instance
+DEFAULT_CODEC = JsonCodec.name
+
+def register_codec(codec) -> None:
+    """
+    Makes a codec available for negotiation under its name.
+
+    Args:
+        codec: An object with a name attribute and encode/decode methods.
+    """
+    CODECS[codec.name] = codec
+
+def get_codec(name: str):
+    """
+    Looks up a registered codec.
+
+    Args:
+        name (str): The codec name.
+
+    Returns:
+        The codec instance.
+    """
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec: {name}")
+
+def negotiate_codec(offered) -> str:
+    """
+    Picks the first codec from a client's preference list that is registered here.
+
+    Args:
+        offered (Optional[list]): Codec names in the client's order of preference.
+
+    Returns:
+        str: The chosen codec name, the default codec if none of the offered ones is known.
+    """
+    if isinstance(offered, list):
+        for name in offered:
+            if isinstance(name, str) and name in CODECS:
+                return name
+    return DEFAULT_CODEC
+
+register_codec(JsonCodec())
+register_codec(BinaryCodec())
@@ -0,0 +1,269 @@
+## metrics.py
+import sys
+import threading
+from bisect import bisect_left
+from collections import Counter as StackCounter
+from typing import Callable, Optional
+
+# Upper bounds in seconds, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metric:
+    """
+    The Metric class is the base of every metric. A metric declared with label
+    names is a family: labels() returns the child holding one combination of
+    label values, created on first use and reused afterwards.
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        """
+        Initializes the metric.
+
+        Args:
+            name (str): The metric name in Prometheus notation.
+            help_text (str): A one-line description shown in the exposition.
+            labelnames (tuple): The names of the labels children are keyed by.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self._children = {}  # label values: child metric
+
+    def labels(self, *values):
+        """
+        Returns the child metric for one combination of label values.
+
+        Args:
+            *values: One value per label name, in declaration order.
+
+        Returns:
+            Metric: The child metric.
+        """
+        child = self._children.get(values)
+        if child is None:
+            with self.lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> list:
+        """
+        Returns (name suffix, label pairs, value) tuples for the exposition.
+        """
+        if not self.labelnames:
+            return self._own_samples(())
+        samples = []
+        for values, child in sorted(self._children.items()):
+            samples.extend(child._own_samples(tuple(zip(self.labelnames, values))))
+        return samples
+
+    def _new_child(self):
+        return type(self)(self.name, self.help_text)
+
+    def _own_samples(self, labels: tuple) -> list:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, such as the number of messages handled.
+    """
+
+    TYPE = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+    def _own_samples(self, labels: tuple) -> list:
+        return [('', labels, self.value)]
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. A gauge can also read its value from a
+    function at collection time, so nothing has to keep it up to date.
+    """
+
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+        self.function = function
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.function = function
+
+    def _own_samples(self, labels: tuple) -> list:
+        return [('', labels, self.function() if self.function else self.value)]
+
+
+class Histogram(Metric):
+    """
+    Counts observations, typically durations in seconds, into fixed buckets.
+    Observing costs one binary search and three additions.
+    """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one counts observations above every bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def _new_child(self):
+        return Histogram(self.name, self.help_text, buckets=self.buckets)
+
+    def _own_samples(self, labels: tuple) -> list:
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            samples.append(('_bucket', labels + (('le', format_value(bound)),), cumulative))
+        samples.append(('_sum', labels, total))
+        samples.append(('_count', labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    The MetricsRegistry class holds every metric of the process and renders
+    them in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics = {}  # name: Metric
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Adds a metric, or returns the one already registered under its name so
+        modules imported more than once share it.
+
+        Args:
+            metric (Metric): The metric to add.
+
+        Returns:
+            Metric: The registered metric.
+        """
+        with self.lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for suffix, labels, value in metric.samples():
+                if labels:
+                    label_text = ','.join(f'{name}="{escape(str(label))}"' for name, label in labels)
+                    lines.append(f"{metric.name}{suffix}{{{label_text}}} {format_value(value)}")
+                else:
+                    lines.append(f"{metric.name}{suffix} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+def counter(name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+def gauge(name: str, help_text: str, labelnames: tuple = (), function: Optional[Callable[[], float]] = None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labelnames, function))
+
+def histogram(name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class SamplingProfiler:
+    """
+    The SamplingProfiler class periodically records the call stack of one
+    thread, typically the server's event loop, from a background thread. The
+    profiled thread runs unmodified, so the overhead is one stack walk per
+    interval. Results are written as collapsed stacks, the input format of
+    common flame graph tools.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        Initializes a stopped profiler.
+
+        Args:
+            thread_id (int): The identifier (threading.get_ident()) of the thread to sample.
+            interval (float): The time between samples in seconds.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = StackCounter()  # "outer;...;inner" frames: samples
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples as collapsed stacks, one "frame;frame;... count" line per distinct stack.
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as output:
+            output.write(self.collapsed())
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
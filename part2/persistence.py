@@ -0,0 +1,287 @@
+## persistence.py
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+class RecoveredState:
+    """
+    The state rebuilt from the latest snapshot and the event log after it.
+    Games are plain dictionaries with the fields of a snapshot: word,
+    player1, player2, attempts, hints and hint_count.
+    """
+
+    def __init__(self):
+        self.games = {}  # game_id: game fields
+        self.sessions = {}  # session token: (client_id, wall-clock expiry time)
+        self.client_id_counter = 0
+        self.game_id_counter = 0
+
+    def apply(self, record: dict) -> None:
+        """
+        Applies one log record. Records carry absolute values rather than
+        increments, so applying one the snapshot already reflects changes nothing.
+
+        Args:
+            record (dict): The decoded log record.
+        """
+        event = record.get('event')
+        game_id = record.get('game_id')
+        if event == 'started':
+            if game_id not in self.games:
+                self.games[game_id] = {'word': record['word'], 'player1': record['player1'],
+                                       'player2': record['player2'], 'attempts': 0, 'hints': [], 'hint_count': 0}
+            self._count('game', game_id)
+            self._count('client', record['player1'])
+            self._count('client', record['player2'])
+        elif event == 'guess':
+            game = self.games.get(game_id)
+            if game is not None:
+                game['attempts'] = max(game['attempts'], record['attempts'])
+        elif event == 'hint':
+            game = self.games.get(game_id)
+            if game is not None and record['hint_count'] > game['hint_count']:
+                game['hints'].append(record['hint'])
+                game['hint_count'] = record['hint_count']
+        elif event == 'finished':
+            self.games.pop(game_id, None)
+        elif event == 'session':
+            self.sessions[record['token']] = (record['client_id'], record['expires_at'])
+            self._count('client', record['client_id'])
+        elif event == 'session_used':
+            self.sessions.pop(record['token'], None)
+
+    def _count(self, id_type: str, identifier: str) -> None:
+        """
+        Moves an ID counter past a recovered identifier so new IDs never reuse it.
+        """
+        try:
+            number = int(identifier.rsplit('_', 1)[1])
+        except (AttributeError, IndexError, ValueError):
+            return
+        if id_type == 'game':
+            self.game_id_counter = max(self.game_id_counter, number)
+        else:
+            self.client_id_counter = max(self.client_id_counter, number)
+
+
+class GameStore:
+    """
+    The GameStore class persists games and sessions so a restarted server can
+    pick up where it stopped. The server appends records (game started,
+    guess, hint, finished, session issued or used) from its event loop; a
+    writer thread writes them to an append-only log in batches and fsyncs at
+    most once per fsync_interval. Every snapshot_interval the writer thread
+    also writes a compact snapshot of the live state and starts a new log
+    segment, so recovery reads one snapshot plus a short tail of the log.
+    Both are read through mmap on startup.
+
+    Records still waiting for the writer thread, at most flush_interval
+    seconds' worth, are lost if the process crashes.
+    """
+
+    SNAPSHOT_FILE = 'snapshot.jsonl'
+    SEGMENT_PATTERN = 'events.{:08d}.log'
+
+    def __init__(self, directory: str, flush_interval: float = 0.05, fsync_interval: Optional[float] = 1.0,
+                 snapshot_interval: float = 300.0):
+        """
+        Initializes a store kept in a directory, creating it if needed.
+
+        Args:
+            directory (str): Where the snapshot and log segments are kept.
+            flush_interval (float): Seconds between writes of the pending records.
+            fsync_interval (Optional[float]): Seconds between fsyncs of the log; 0 fsyncs every write, None never fsyncs.
+            snapshot_interval (float): Seconds between snapshots.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+        self._pending = deque()  # Records appended by the event loop, not yet written
+        self._segment = 0
+        self._log = None
+        self._snapshot_source = None
+        self._closing = threading.Event()
+        self._thread = None
+
+    def load(self) -> RecoveredState:
+        """
+        Rebuilds the state from the latest snapshot and the log segments written after it.
+
+        Returns:
+            RecoveredState: The recovered games, sessions and ID counters.
+        """
+        state = RecoveredState()
+        first_segment = 0
+        snapshot_path = os.path.join(self.directory, self.SNAPSHOT_FILE)
+        lines = self._read_lines(snapshot_path)
+        header = next(lines, None)
+        if header is not None:
+            header = json.loads(header)
+            first_segment = header['segment']
+            state.client_id_counter = header['client_id_counter']
+            state.game_id_counter = header['game_id_counter']
+            for line in lines:
+                record = json.loads(line)
+                if 'token' in record:
+                    state.sessions[record['token']] = (record['client_id'], record['expires_at'])
+                else:
+                    state.games[record.pop('game_id')] = record
+
+        for segment in self._segments():
+            if segment < first_segment:
+                continue
+            for line in self._read_lines(self._segment_path(segment)):
+                state.apply(json.loads(line))
+            self._segment = max(self._segment, segment)
+
+        now = time.time()
+        state.sessions = {token: session for token, session in state.sessions.items() if session[1] > now}
+        return state
+
+    def start(self, snapshot_source: Callable[[], dict]) -> None:
+        """
+        Opens a new log segment and starts the writer thread.
+
+        Args:
+            snapshot_source (Callable[[], dict]): Called from the writer thread to get the state to snapshot:
+                {'games': list of game dicts with a game_id, 'sessions': list of (token, client_id, expires_at),
+                'client_id_counter': int, 'game_id_counter': int}.
+        """
+        self._snapshot_source = snapshot_source
+        self._segment += 1
+        self._log = open(self._segment_path(self._segment), 'ab')
+        self._closing.clear()
+        self._thread = threading.Thread(target=self._run, name='game-store', daemon=True)
+        self._thread.start()
+
+    def append(self, record: dict) -> None:
+        """
+        Queues a record for the log. Cheap enough for the event loop: encoding
+        and writing happen on the writer thread.
+
+        Args:
+            record (dict): The record; it must not be modified afterwards.
+        """
+        self._pending.append(record)
+
+    def close(self) -> None:
+        """
+        Stops the writer thread and writes a final snapshot, so the next start
+        has no log to replay. Records appended afterwards are ignored.
+        """
+        if self._thread is None:
+            return
+        self._closing.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.snapshot_now()
+        finally:
+            self._log.close()
+            self._log = None
+
+    def snapshot_now(self) -> None:
+        """
+        Writes a snapshot and starts a new log segment. Must not run concurrently with the writer thread.
+        """
+        # Everything logged so far is in the old segment and already reflected in the state we read next
+        self._write_pending(fsync=True)
+        self._log.close()
+        self._segment += 1
+        self._log = open(self._segment_path(self._segment), 'ab')
+
+        state = self._snapshot_source()
+        path = os.path.join(self.directory, self.SNAPSHOT_FILE)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as snapshot:
+            header = {'segment': self._segment, 'client_id_counter': state['client_id_counter'],
+                      'game_id_counter': state['game_id_counter']}
+            snapshot.write(json.dumps(header).encode('utf-8') + b'\n')
+            for game in state['games']:
+                snapshot.write(json.dumps(game).encode('utf-8') + b'\n')
+            for token, client_id, expires_at in state['sessions']:
+                record = {'token': token, 'client_id': client_id, 'expires_at': expires_at}
+                snapshot.write(json.dumps(record).encode('utf-8') + b'\n')
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, path)
+
+        for segment in self._segments():
+            if segment < self._segment:
+                os.remove(self._segment_path(segment))
+
+    def _run(self) -> None:
+        """
+        The writer thread: writes pending records in batches, fsyncs and snapshots on schedule.
+        """
+        next_fsync = next_snapshot = time.monotonic()
+        next_snapshot += self.snapshot_interval
+        while not self._closing.wait(self.flush_interval):
+            now = time.monotonic()
+            fsync = self.fsync_interval is not None and now >= next_fsync
+            try:
+                if self._write_pending(fsync) and fsync:
+                    next_fsync = now + self.fsync_interval
+                if now >= next_snapshot:
+                    self.snapshot_now()
+                    next_snapshot = now + self.snapshot_interval
+            except Exception as e:
+                print(f"Failed to persist game state: {e}")
+
+    def _write_pending(self, fsync: bool) -> bool:
+        """
+        Writes every pending record with a single write call.
+
+        Returns:
+            bool: True if anything was written.
+        """
+        if not self._pending:
+            return False
+        lines = []
+        while self._pending:
+            lines.append(json.dumps(self._pending.popleft()).encode('utf-8'))
+        lines.append(b'')
+        self._log.write(b'\n'.join(lines))
+        self._log.flush()
+        if fsync:
+            os.fsync(self._log.fileno())
+        return True
+
+    def _segments(self) -> list:
+        segments = []
+        for path in glob.glob(os.path.join(self.directory, 'events.*.log')):
+            try:
+                segments.append(int(os.path.basename(path).split('.')[1]))
+            except ValueError:
+                continue
+        return sorted(segments)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, self.SEGMENT_PATTERN.format(segment))
+
+    @staticmethod
+    def _read_lines(path: str):
+        """
+        Maps a file into memory and yields its lines, without reading it through Python buffers.
+        """
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b''):
+                    if line.endswith(b'\n'):
+                        yield line
+                    else:
+                        # A record cut short by a crash can only be the last one
+                        return
@@ -0,0 +1,105 @@
+## ratelimit.py
+from typing import Optional
+
+class TokenBucket:
+    """
+    The TokenBucket class allows bursts of up to capacity events and refills
+    at rate events per second. Tokens are only counted when an event is
+    taken, so an idle bucket costs nothing.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        """
+        Initializes a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): The most tokens the bucket holds, i.e. the largest burst.
+            now (float): The current time.monotonic() value.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Takes one token if there is one.
+
+        Args:
+            now (float): The current time.monotonic() value.
+
+        Returns:
+            float: 0.0 if a token was taken, otherwise the seconds until one is available.
+        """
+        tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens >= 1.0:
+            self.tokens = tokens - 1.0
+            return 0.0
+        self.tokens = tokens
+        return (1.0 - tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    The RateLimiter class applies a token bucket per client and message type.
+    The buckets live in a dictionary the caller keeps for each client (the
+    server keeps it on the Connection), so they go away with the client and
+    one limiter can be shared by any number of servers.
+    """
+
+    # message type: (messages per second, burst). Players guess and hint at human speed.
+    DEFAULT_LIMITS = {
+        'guess': (10.0, 20),
+        'hint': (10.0, 20),
+        'request_opponents': (5.0, 20),
+        'find_match': (2.0, 10),
+        'cancel_match': (2.0, 10),
+        'start_game': (2.0, 10),
+        'ping': (1.0, 10),
+    }
+    # Shared by every type without a limit of its own, so made-up types cannot create buckets without end
+    DEFAULT_LIMIT = (10.0, 20)
+    # Authentication has its own limits in the Authenticator; answering a heartbeat must never be refused
+    EXEMPT = frozenset(('authentication', 'pong'))
+
+    def __init__(self, limits: Optional[dict] = None, default_limit: Optional[tuple] = DEFAULT_LIMIT):
+        """
+        Initializes a rate limiter.
+
+        Args:
+            limits (Optional[dict]): message type: (rate, burst), replacing DEFAULT_LIMITS for those types.
+            default_limit (Optional[tuple]): (rate, burst) for other types, or None to leave them unlimited.
+        """
+        self.limits = dict(self.DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.default_limit = default_limit
+
+    def check(self, buckets: dict, message_type: str, now: float) -> float:
+        """
+        Takes a token for a message from one client.
+
+        Args:
+            buckets (dict): The client's buckets, filled in as its message types first appear.
+            message_type (str): The type of the message.
+            now (float): The current time.monotonic() value.
+
+        Returns:
+            float: 0.0 if the message may be processed, otherwise the seconds the client should wait.
+        """
+        if message_type in self.EXEMPT:
+            return 0.0
+        limit = self.limits.get(message_type)
+        if limit is None:
+            limit = self.default_limit
+            if limit is None:
+                return 0.0
+            message_type = None
+        bucket = buckets.get(message_type)
+        if bucket is None:
+            bucket = buckets[message_type] = TokenBucket(limit[0], limit[1], now)
+        return bucket.take(now)
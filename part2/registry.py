@@ -0,0 +1,96 @@
+## registry.py
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from game import Game
+
+class GameRegistry:
+    """
+    The GameRegistry class stores active games in shards selected by game ID,
+    each guarded by its own lock. Games in different shards never contend,
+    lookups are plain dictionary reads that take no lock at all, and state
+    changes to a game are made while holding its shard's lock so that the
+    event loop and the web interface can both update it safely.
+    """
+
+    def __init__(self, shard_count: int = 64):
+        """
+        Initializes an empty registry.
+
+        Args:
+            shard_count (int): The number of independently locked shards.
+        """
+        self._shards = [{} for _ in range(shard_count)]
+        self._locks = [threading.Lock() for _ in range(shard_count)]
+
+    def _index(self, game_id: str) -> int:
+        return hash(game_id) % len(self._shards)
+
+    def add(self, game_id: str, game: Game) -> None:
+        """
+        Registers a game under its identifier.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+            game (Game): The game to register.
+        """
+        index = self._index(game_id)
+        with self._locks[index]:
+            self._shards[index][game_id] = game
+
+    def get(self, game_id: str) -> Optional[Game]:
+        """
+        Looks up a game without locking. Use locked() to change its state.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+
+        Returns:
+            Optional[Game]: The game, or None if it is not registered.
+        """
+        return self._shards[self._index(game_id)].get(game_id)
+
+    def remove(self, game_id: str) -> Optional[Game]:
+        """
+        Unregisters a game.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+
+        Returns:
+            Optional[Game]: The removed game, or None if it was not registered.
+        """
+        index = self._index(game_id)
+        with self._locks[index]:
+            return self._shards[index].pop(game_id, None)
+
+    @contextmanager
+    def locked(self, game_id: str) -> Iterator[Optional[Game]]:
+        """
+        Holds the lock of a game's shard for the duration of the with block.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+
+        Yields:
+            Optional[Game]: The game, or None if it is not registered.
+        """
+        index = self._index(game_id)
+        with self._locks[index]:
+            yield self._shards[index].get(game_id)
+
+    def items(self) -> list:
+        """
+        Returns a point-in-time list of (game_id, game) pairs, copying one shard at a time.
+        """
+        items = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                items.extend(shard.items())
+        return items
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._shards[self._index(game_id)]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
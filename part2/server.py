@@ -1,9 +1,50 @@
 import socket
+import sys
 import threading
-import select
-from protocol import Protocol
-from game import Game
-import bcrypt
+import time
+import selectors
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Iterable, Optional
+from auth import Authenticator, AuthenticatorBusy
+from config import load_password_hash
+from message_codecs import negotiate_codec
+from connection import Connection
+from dictionary import Dictionary
+from events import EventBus
+from game import Game, GameState
+from matchmaking import Matchmaker
+from persistence import GameStore
+from ratelimit import RateLimiter
+from registry import GameRegistry
+from snapshots import SnapshotStore
+from timers import TimerQueue
+from transport import TcpTransport, Transport, UnixTransport
+import metrics
+
+HANDLE_SECONDS = metrics.histogram('server_handle_client_seconds', 'Time spent handling one readable client socket')
+MESSAGES = metrics.counter('server_messages_total', 'Messages received from clients', ('type',))
+MESSAGE_SECONDS = metrics.histogram('server_message_seconds', 'Time spent processing one client message', ('type',))
+AUTHENTICATIONS = metrics.counter('server_authentications_total', 'Authentication requests by outcome', ('result',))
+SEND_FAILURES = metrics.counter('server_send_failures_total', 'Messages or flushes that failed', ('reason',))
+CONNECTIONS = metrics.gauge('server_connections', 'Open client connections')
+CLIENTS = metrics.gauge('server_clients', 'Authenticated clients')
+ACTIVE_GAMES = metrics.gauge('server_active_games', 'Games in progress')
+OUTGOING_BYTES = metrics.gauge('server_outgoing_bytes', 'Bytes waiting in client send queues')
+OUTGOING_FRAMES = metrics.gauge('server_outgoing_frames', 'Frames waiting in client send queues')
+LARGEST_OUTGOING_QUEUE = metrics.gauge('server_largest_outgoing_queue_bytes', 'Bytes waiting in the fullest client send queue')
+FRAMES_PER_SEND = metrics.histogram('server_frames_per_send', 'Frames offered to one sendmsg() call',
+                                    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+REAPED_CONNECTIONS = metrics.counter('server_reaped_connections_total',
+                                     'Connections closed because the client went silent', ('reason',))
+REJECTED_MESSAGES = metrics.counter('server_rejected_messages_total',
+                                    'Messages refused before processing, by type and reason', ('type', 'reason'))
+REJECTED_GUESSES = metrics.counter('server_rejected_guesses_total', 'Guesses rejected before reaching a game')
+SLOW_CLIENTS = metrics.counter('server_slow_client_messages_total',
+                               'Messages that did not fit a client send queue, by what was done about it', ('action',))
+PENDING_CALLBACKS = metrics.gauge('server_pending_callbacks', 'Callbacks queued for the event loop by other threads')
+PENDING_TIMERS = metrics.gauge('server_pending_timers', 'Timers scheduled on the event loop')
+PENDING_AUTHENTICATIONS = metrics.gauge('server_pending_authentications', 'Password checks queued or running')
 
 class Server:
     """
@@ -11,66 +52,317 @@ class Server:
     managing active games, and authenticating clients.
     """
 
-    def __init__(self, host: str = 'localhost', port: int = 12345):
+    # Message types counted under their own label; anything else is counted as 'unknown'
+    MESSAGE_TYPES = frozenset(('authentication', 'request_opponents', 'find_match', 'cancel_match',
+                               'start_game', 'guess', 'hint', 'ping', 'pong'))
+
+    # reason passed to end_game: state the finished game is left in
+    END_STATES = {
+        'guessed': GameState.GUESSED,
+        'player_disconnected': GameState.ABANDONED,
+        'idle_timeout': GameState.EXPIRED,
+    }
+
+    # What to do with a message for a client whose send queue is full: 'disconnect' the
+    # client, or 'drop' the message and keep the client
+    SLOW_CLIENT_POLICIES = ('disconnect', 'drop')
+
+    # Seconds a client refused because the event loop is saturated is told to wait
+    OVERLOAD_RETRY_AFTER = 0.1
+
+    def __init__(self, host: str = 'localhost', port: int = 12345, backlog: int = socket.SOMAXCONN,
+                 authenticator: Optional[Authenticator] = None, game_idle_timeout: float = 600.0,
+                 unix_socket_path: Optional[str] = None, store: Optional[GameStore] = None,
+                 max_outgoing_bytes: Optional[int] = 1 << 20, slow_client_policy: str = 'disconnect',
+                 heartbeat_interval: Optional[float] = 30.0, idle_timeout: Optional[float] = 90.0,
+                 read_timeout: Optional[float] = 15.0, dictionary: Optional[Dictionary] = None,
+                 rate_limiter: Optional[RateLimiter] = None, rate_limits: bool = True,
+                 max_messages_per_iteration: Optional[int] = 2048,
+                 password_hash: Optional[bytes] = None):
+        if slow_client_policy not in self.SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {slow_client_policy}")
         self.host = host
         self.port = port
-        self.clients = {}  # client_id: client_socket
-        self.games = {}  # game_id: Game instance
-        self.protocol = Protocol()
-        self.server_socket = None
-        # self.unix_socket = None
+        self.backlog = backlog
+        # Every transport listens at once and feeds the same event loop
+        self.transports = [TcpTransport(host, port)]
+        if unix_socket_path:
+            self.transports.append(UnixTransport(unix_socket_path))
+        self.listeners = {}  # listening socket: Transport
+        self.clients = {}  # client_id: Connection
+        self.connections = {}  # client_socket: Connection (its client_id once authenticated)
+        self.games = GameRegistry()  # game_id: Game instance, sharded by game_id
+        self.snapshots = SnapshotStore()  # game_id: latest GameSnapshot, read by the web interface
+        self.events = EventBus()  # Game events streamed to web spectators
+        self.player_games = {}  # client_id: game_id of the game the client is playing
+        self.matchmaker = Matchmaker()
+        self.game_idle_timeout = game_idle_timeout
+        self.timers = TimerQueue()
+        self.selector = None
+        self.running = False
+        self._wakeup_reader = None
+        self._wakeup_writer = None
+        self._callbacks = deque()  # Work handed to the event loop by other threads
+        self._flush_queue = []  # Connections with frames queued since the last flush
+        self._replying_to = None  # (client socket, request_id) of the request being processed, if it has an ID
+        self.max_outgoing_bytes = max_outgoing_bytes  # Per client send queue limit, None for no limit
+        self.slow_client_policy = slow_client_policy
+        # A client silent for heartbeat_interval is pinged, and disconnected once silent for idle_timeout;
+        # one that starts a frame has read_timeout to finish it. None disables each of them.
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.read_timeout = read_timeout
+        self.dictionary = dictionary  # Words that may be picked and guessed; any word of letters if None
+        # Each client's messages of each type are limited by rate_limiter (a fresh RateLimiter unless one is
+        # given to share; none if rate_limits is False), and the messages of all clients handled in one event
+        # loop iteration by max_messages_per_iteration (None disables it)
+        self.rate_limiter = (rate_limiter or RateLimiter()) if rate_limits else None
+        self.max_messages_per_iteration = max_messages_per_iteration
+        self._admitted = 0  # Messages admitted in the current event loop iteration
         self.client_id_counter = 0
         self.game_id_counter = 0
+        self.id_stride = 1  # Worker processes step their counters by the worker count so IDs never collide
         self.lock = threading.Lock()
-        # Assume hashed_password is the hashed password retrieved from a secure storage
-        self.hashed_password = bcrypt.hashpw("securepassword".encode('utf-8'), bcrypt.gensalt())
+        # The hash is computed ahead of time and read from configuration, so starting a server never runs bcrypt
+        self.hashed_password = password_hash or load_password_hash()
+        self.authenticator = authenticator or Authenticator(self.hashed_password)
+        self.store = store  # Persists games and sessions across restarts, if set
+        self._register_gauges()
 
     def start_server(self) -> None:
         """
-        Starts the TCP/UNIX server to listen for incoming connections.
+        Starts the TCP/UNIX server and runs the event loop that multiplexes
+        the listening sockets and every connected client on a single thread.
         """
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen()
-            print(f"Server started on {self.host}:{self.port}")
+            self.selector = selectors.DefaultSelector()
+            if self.store is not None:
+                self._restore_state()
 
-            # self.unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            # self.unix_socket.bind(unix_socket_path)
-            # self.unix_socket.listen()
+            for transport in self.transports:
+                listener = transport.listen(self.backlog)
+                self.listeners[listener] = transport
+                self.selector.register(listener, selectors.EVENT_READ, transport)
+                print(f"Server started on {transport.describe()}")
+
+            # The wakeup pair lets other threads interrupt a blocking select()
+            self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+            self._wakeup_reader.setblocking(False)
+            self._wakeup_writer.setblocking(False)
+            self.selector.register(self._wakeup_reader, selectors.EVENT_READ)
+            self._setup_event_loop()
 
             # Main server loop
-            while True:
-                readable, _, _ = select.select([self.server_socket], [], [], 0.1)
-                for sock in readable:
-                    if sock is self.server_socket:
-                        client_socket, _ = self.server_socket.accept()
-                        threading.Thread(target=self.handle_client, args=(client_socket,)).start()
+            self.running = True
+            while self.running:
+                self._admitted = 0
+                for key, mask in self.selector.select(self.timers.next_timeout()):
+                    if key.fileobj in self.listeners:
+                        self.accept_clients(key.fileobj, key.data)
+                    elif key.fileobj is self._wakeup_reader:
+                        self._drain_wakeup()
+                        self._run_callbacks()
+                    else:
+                        connection = key.data
+                        if connection.closed:
+                            continue
+                        if mask & selectors.EVENT_READ:
+                            started = time.perf_counter()
+                            self.handle_client(connection.socket)
+                            HANDLE_SECONDS.observe(time.perf_counter() - started)
+                        if mask & selectors.EVENT_WRITE and not connection.closed:
+                            self.flush_client(connection)
+                self.timers.run_expired()
+                # Everything this iteration produced goes out together, a few frames per system call
+                self._flush_queued()
         except Exception as e:
             print(f"Server encountered an error: {e}")
         finally:
-            if self.server_socket:
-                self.server_socket.close()
+            self.running = False
+            self._close_all()
+
+    def stop_server(self) -> None:
+        """
+        Asks the event loop to stop. Safe to call from any thread.
+        """
+        self.running = False
+        self._wakeup()
+
+    def call_soon_threadsafe(self, callback: Callable, *args) -> None:
+        """
+        Schedules a callback to run on the event loop thread. Safe to call from any thread.
+
+        Args:
+            callback (Callable): The function to call.
+            *args: The arguments to call it with.
+        """
+        self._callbacks.append((callback, args))
+        self._wakeup()
+
+    def accept_clients(self, listener: socket.socket, transport: Transport) -> None:
+        """
+        Accepts every pending connection on a listening socket and registers
+        the new client sockets with the event loop.
+
+        Args:
+            listener (socket.socket): The listening socket that became readable.
+            transport (Transport): The transport the listener belongs to.
+        """
+        while True:
+            try:
+                client_socket, address = listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client_socket.setblocking(False)
+            transport.configure(client_socket)
+            connection = Connection(client_socket, address, self.max_outgoing_bytes)
+            self.connections[client_socket] = connection
+            self.selector.register(client_socket, selectors.EVENT_READ, connection)
+            self._schedule_liveness_check(connection)
 
     def handle_client(self, client_socket: socket.socket) -> None:
         """
-        Handles the client connection, processing incoming messages.
+        Handles a readable client connection, processing every complete message
+        received so far. Partial frames stay buffered until the rest arrives.
 
         Args:
             client_socket (socket.socket): The client's socket connection.
         """
+        connection = self.connections.get(client_socket)
+        if connection is None:
+            return
         try:
-            while True:
-                message_bytes = client_socket.recv(1024)
-                if not message_bytes:
+            if not connection.decoder.recv_from(client_socket):
+                self.disconnect_client(client_socket)
+                return
+            decoded_messages = False
+            for message in connection.decoder.messages():
+                decoded_messages = True
+                started = time.perf_counter()
+                message_type = message.get('type')
+                label = message_type if message_type in self.MESSAGE_TYPES else 'unknown'
+                self._replying_to = self._request_of(client_socket, message)
+                try:
+                    refusal = self._admit(connection, label)
+                    if refusal is not None:
+                        self.send_message_to_client(client_socket, refusal)
+                    else:
+                        self.process_client_message(client_socket, message)
+                finally:
+                    self._replying_to = None
+                MESSAGES.labels(label).inc()
+                MESSAGE_SECONDS.labels(label).observe(time.perf_counter() - started)
+                if connection.closed or connection.close_when_flushed:
                     break
-                message = self.protocol.decode_message(message_bytes)
-                self.process_client_message(client_socket, message)
+            connection.received(decoded_messages)
+            if connection.partial_since is not None and self.read_timeout is not None:
+                self._schedule_liveness_check(connection)
+        except (BlockingIOError, InterruptedError):
+            return
         except ConnectionError:
             print("Client disconnected")
-        finally:
-            client_socket.close()
+            self.disconnect_client(client_socket)
+        except Exception as e:
+            # A misbehaving client must never take the whole event loop down
+            print(f"Error handling client message: {e}")
+            self.disconnect_client(client_socket)
+
+    def _admit(self, connection: Connection, message_type: str) -> Optional[dict]:
+        """
+        Decides whether to process a client message: the client must be
+        within its rate for the message type, and the event loop must not
+        have taken in max_messages_per_iteration messages already this
+        iteration. Refusing costs far less than processing, and a client's
+        refused messages never count against everyone else's share.
+
+        Args:
+            connection (Connection): The connection the message came from.
+            message_type (str): The message type, as counted in MESSAGE_TYPES.
+
+        Returns:
+            Optional[dict]: None to process the message, otherwise the error to answer it with.
+        """
+        if self.rate_limiter is not None:
+            retry_after = self.rate_limiter.check(connection.rate_limits, message_type, time.monotonic())
+            if retry_after:
+                REJECTED_MESSAGES.labels(message_type, 'rate_limited').inc()
+                return {'type': 'error', 'message': f"Too many {message_type} messages, slow down",
+                        'retry_after': round(retry_after, 3)}
+        if message_type != 'pong' and self.max_messages_per_iteration is not None:
+            self._admitted += 1
+            if self._admitted > self.max_messages_per_iteration:
+                REJECTED_MESSAGES.labels(message_type, 'overloaded').inc()
+                return {'type': 'error', 'message': 'Server is busy, try again later',
+                        'retry_after': self.OVERLOAD_RETRY_AFTER}
+        return None
+
+    def disconnect_client(self, client_socket: socket.socket) -> None:
+        """
+        Unregisters and closes a client connection.
+
+        Args:
+            client_socket (socket.socket): The client's socket connection.
+        """
+        connection = self.connections.pop(client_socket, None)
+        if connection is None or connection.closed:
+            return
+        connection.closed = True
+        if connection.liveness_timer is not None:
+            self.timers.cancel(connection.liveness_timer)
+            connection.liveness_timer = None
+        if connection.client_id is not None:
+            self.clients.pop(connection.client_id, None)
+            self.matchmaker.remove(connection.client_id)
+            game_id = self.player_games.get(connection.client_id)
+            if game_id is not None:
+                self.end_game(game_id, 'player_disconnected')
+        try:
+            self.selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        client_socket.close()
+
+    def flush_client(self, connection: Connection) -> None:
+        """
+        Writes queued frames to a client, watching for writability only while
+        some are left over.
+
+        Args:
+            connection (Connection): The connection to flush.
+        """
+        try:
+            drained, batches = connection.flush()
+        except OSError as e:
+            print(f"Failed to send message to client: {e}")
+            SEND_FAILURES.labels('socket_error').inc()
+            self.disconnect_client(connection.socket)
+            return
+        for frames in batches:
+            FRAMES_PER_SEND.observe(frames)
+        if drained and connection.close_when_flushed:
+            self.disconnect_client(connection.socket)
+            return
+        if connection.close_when_flushed:
+            events = selectors.EVENT_WRITE
+        else:
+            events = selectors.EVENT_READ if drained else selectors.EVENT_READ | selectors.EVENT_WRITE
+        if events != connection.events:
+            connection.events = events
+            self.selector.modify(connection.socket, events, connection)
+
+    def close_client_when_flushed(self, connection: Connection) -> None:
+        """
+        Stops reading from a client and closes it once its pending replies are sent.
+
+        Args:
+            connection (Connection): The connection to close.
+        """
+        connection.close_when_flushed = True
+        if not connection.outgoing:
+            self.disconnect_client(connection.socket)
+        else:
+            connection.events = selectors.EVENT_WRITE
+            self.selector.modify(connection.socket, connection.events, connection)
 
     def process_client_message(self, client_socket: socket.socket, message: dict) -> None:
         """
@@ -81,65 +373,300 @@ class Server:
             message (dict): The decoded message from the client.
         """
         message_type = message.get('type')
-        if message_type == 'authentication':
-            self.authenticate_client(client_socket, message.get('password'))
+        if message_type == 'ping':
+            self.send_message_to_client(client_socket, {'type': 'pong'})
+        elif message_type == 'pong':
+            # Receiving it was the point; handle_client has already noted the client is alive
+            pass
+        elif message_type == 'authentication':
+            self.authenticate_client(client_socket, message.get('password'), message.get('session_token'),
+                                     message.get('codecs'))
         elif message_type == 'request_opponents':
             client_id = self.get_client_id(client_socket)
-            opponents_list = self.get_opponents_list(client_id)
-            response = {'type': 'opponents_list', 'opponents': opponents_list}
+            offset = message.get('offset')
+            limit = message.get('limit')
+            prefix = message.get('prefix')
+            opponents_list, next_offset = self.get_opponents_list(
+                client_id,
+                offset if isinstance(offset, int) else 0,
+                limit if isinstance(limit, int) else Matchmaker.DEFAULT_PAGE_SIZE,
+                prefix if isinstance(prefix, str) else '')
+            response = {'type': 'opponents_list', 'opponents': opponents_list, 'next_offset': next_offset}
+            self.send_message_to_client(client_socket, response)
+        elif message_type == 'find_match':
+            self.find_match(client_socket, message.get('word'))
+        elif message_type == 'cancel_match':
+            client_id = self.get_client_id(client_socket)
+            response = {'type': 'match_cancelled', 'cancelled': self.matchmaker.cancel(client_id)}
             self.send_message_to_client(client_socket, response)
         elif message_type == 'start_game':
             client_id = self.get_client_id(client_socket)
             opponent_id = message.get('opponent_id')
-            if client_id not in self.clients or opponent_id not in self.clients:
+            if not self.is_connected(client_id) or not self.is_connected(opponent_id):
                 response = {'type': 'error', 'message': 'Invalid client or opponent ID'}
                 self.send_message_to_client(client_socket, response)
                 return
+            error = self.check_word(message.get('word'))
+            if error is not None:
+                response = {'type': 'error', 'message': error}
+                self.send_message_to_client(client_socket, response)
+                return
             self.initiate_game(client_id, opponent_id, message.get('word'))
         elif message_type == 'guess':
-            game_id = message.get('game_id')
-            if game_id in self.games:
-                game = self.games[game_id]
-                result = game.guess_word(message.get('guess'))
-                response = {'type': 'guess_result', 'result': result}
-                self.send_message_to_client(client_socket, response)
+            client_id = self.get_client_id(client_socket)
+            game_id = message.get('game_id') or self.player_games.get(client_id)
+            guess = message.get('guess')
+            with self.games.locked(game_id) as game:
+                if game is None or game.player2 != client_id:
+                    # Only the opponent the word was picked for may guess it
+                    error = 'Game not found' if game is None else 'Only the guessing player can guess in this game'
+                    response = {'type': 'error', 'message': error}
+                    self.send_message_to_client(client_socket, response)
+                    return
+                # Rejected guesses never count as attempts or reach the other player
+                error = game.check_guess(guess)
+                if error is None and self.dictionary is not None and guess.casefold() != game.word \
+                        and guess not in self.dictionary:
+                    error = 'Not a word in the dictionary'
+                if error is not None:
+                    REJECTED_GUESSES.inc()
+                    response = {'type': 'error', 'message': error}
+                    self.send_message_to_client(client_socket, response)
+                    return
+                feedback = game.score_guess(guess)
+                result = feedback == Game.HIT * game.word_length
+                attempts = game.attempts
+                player1 = game.player1
+                self.snapshots.publish(game_id, game)
+                self._record({'event': 'guess', 'game_id': game_id, 'attempts': attempts})
+            response = {'type': 'guess_result', 'result': result, 'feedback': feedback}
+            self.send_message_to_client(client_socket, response)
+
+            # Keep the player who set the word informed of the opponent's progress
+            progress = {'type': 'guess_made', 'game_id': game_id, 'guess': guess, 'attempts': attempts,
+                        'feedback': feedback}
+            self.notify_players([player1], progress)
+            self.events.publish(game_id, {'type': 'guess_made', 'game_id': game_id, 'guess': guess,
+                                          'attempts': attempts, 'result': result, 'feedback': feedback})
+            if result:
+                self.end_game(game_id, 'guessed')
         elif message_type == 'hint':
-            game_id = message.get('game_id')
-            if game_id in self.games:
-                game = self.games[game_id]
-                hint = message.get('hint')
-                game.add_hint(hint)
-                response = {'type': 'hint_acknowledged'}
-                self.send_message_to_client(client_socket, response)
-                
-                # response = {'type': 'hint_received', 'hint': hint}
-                # opponent_id = game.get_opponent()
-                # self.send_message_to_client(self.clients[opponent_id], response)
+            client_id = self.get_client_id(client_socket)
+            game_id = message.get('game_id') or self.player_games.get(client_id)
+            hint = message.get('hint')
+            with self.games.locked(game_id) as game:
+                if game is None or game.player1 != client_id:
+                    error = 'Game not found' if game is None else 'Only the player who picked the word can send hints'
+                    response = {'type': 'error', 'message': error}
+                    self.send_message_to_client(client_socket, response)
+                    return
+                error = game.add_hint(hint)
+                if error is not None:
+                    response = {'type': 'error', 'message': error}
+                    self.send_message_to_client(client_socket, response)
+                    return
+                opponent_id = game.get_opponent()
+                self.snapshots.publish(game_id, game)
+                self._record({'event': 'hint', 'game_id': game_id, 'hint': hint, 'hint_count': game.hint_count})
+            response = {'type': 'hint_acknowledged'}
+            self.send_message_to_client(client_socket, response)
+
+            response = {'type': 'hint_received', 'hint': hint}
+            self.notify_players([opponent_id], response)
+            self.events.publish(game_id, {'type': 'hint_added', 'game_id': game_id, 'hint': hint})
         else:
             response = {'type': 'error', 'message': f"Unknown message type: {message_type}"}
             self.send_message_to_client(client_socket, response)
 
-    def get_client_id(self, client_socket):
-        for client_id, socket in self.clients.items():
-            if socket == client_socket:
-                return client_id
+    def is_connected(self, client_id: str) -> bool:
+        """
+        Checks whether a client is authenticated and connected.
 
-    def authenticate_client(self, client_socket: socket.socket, password: str) -> None:
+        Args:
+            client_id (str): The client identifier.
+
+        Returns:
+            bool: True if the client is connected, False otherwise.
         """
-        Authenticates the client using the provided password.
+        return client_id in self.clients
+
+    def get_client_id(self, client_socket: socket.socket) -> Optional[str]:
+        """
+        Looks up the identifier assigned to an authenticated client socket.
+
+        Args:
+            client_socket (socket.socket): The client's socket connection.
+
+        Returns:
+            Optional[str]: The client identifier, or None if the socket is not authenticated.
+        """
+        connection = self.connections.get(client_socket)
+        return connection.client_id if connection else None
+
+    def authenticate_client(self, client_socket: socket.socket, password: str, session_token: Optional[str] = None,
+                            codecs: Optional[list] = None) -> None:
+        """
+        Authenticates the client using a session token from an earlier connection
+        or the provided password. Password checks run on the authenticator's
+        worker pool and complete later on the event loop.
 
         Args:
             client_socket (socket.socket): The client's socket connection.
             password (str): The password provided by the client for authentication.
+            session_token (Optional[str]): A session token issued by an earlier successful authentication.
+            codecs (Optional[list]): Codec names the client supports, in order of preference.
         """
-        if bcrypt.checkpw(password.encode('utf-8'), self.hashed_password):
-            client_id = self.generate_unique_id('client')
-            self.clients[client_id] = client_socket
-            response = {'type': 'authentication_success', 'client_id': client_id}
+        connection = self.connections[client_socket]
+        if connection.auth_pending:
+            response = {'type': 'authentication_failure', 'message': 'Authentication already in progress'}
             self.send_message_to_client(client_socket, response)
+            return
+
+        if session_token is not None:
+            self._resume_session(connection, session_token, self.authenticator.resume_session(session_token),
+                                 password, codecs)
         else:
+            self._check_password(connection, password, codecs)
+
+    def _resume_session(self, connection: Connection, session_token: str, client_id: Optional[str],
+                        password: Optional[str], codecs: Optional[list]) -> None:
+        """
+        Resumes the identity a session token was issued for. If the token is
+        unknown or expired, the password is checked instead when one was given.
+
+        Args:
+            connection (Connection): The connection that requested authentication.
+            session_token (str): The session token presented by the client.
+            client_id (Optional[str]): The identifier the token was issued for, or None if it was not valid.
+            password (Optional[str]): The password provided alongside the token, if any.
+            codecs (Optional[list]): Codec names the client supports, in order of preference.
+        """
+        if client_id is not None:
+            AUTHENTICATIONS.labels('session').inc()
+            self._record({'event': 'session_used', 'token': session_token})
+            self._complete_authentication(connection, client_id, codecs)
+        elif password is None:
+            AUTHENTICATIONS.labels('invalid_session').inc()
+            response = {'type': 'authentication_failure', 'message': 'Invalid or expired session'}
+            self.send_message_to_client(connection.socket, response)
+        else:
+            self._check_password(connection, password, codecs)
+
+    def _check_password(self, connection: Connection, password: str, codecs: Optional[list]) -> None:
+        """
+        Submits a password check to the authenticator's worker pool, within the
+        per-connection and per-host attempt limits.
+
+        Args:
+            connection (Connection): The connection that requested authentication.
+            password (str): The password provided by the client.
+            codecs (Optional[list]): Codec names the client supports, in order of preference.
+        """
+        client_socket = connection.socket
+        connection.auth_attempts += 1
+        if (connection.auth_attempts > self.authenticator.max_attempts_per_connection
+                or not self.authenticator.allow_attempt(connection.peer_host())):
+            AUTHENTICATIONS.labels('rate_limited').inc()
+            response = {'type': 'authentication_failure', 'message': 'Too many authentication attempts'}
+            self.send_message_to_client(client_socket, response)
+            self.close_client_when_flushed(connection)
+            return
+
+        if not isinstance(password, str):
             response = {'type': 'authentication_failure', 'message': 'Invalid password'}
             self.send_message_to_client(client_socket, response)
+            return
+
+        try:
+            future = self.authenticator.submit(password)
+        except AuthenticatorBusy:
+            AUTHENTICATIONS.labels('busy').inc()
+            response = {'type': 'authentication_failure', 'message': 'Server is busy, try again later'}
+            self.send_message_to_client(client_socket, response)
+            return
+
+        if future.done():
+            self._finish_authentication(connection, future, codecs, self._replying_to)
+        else:
+            connection.auth_pending = True
+            # The reply is sent after other requests may have been answered, so it keeps the request's ID
+            replying_to = self._replying_to
+            future.add_done_callback(lambda done: self.call_soon_threadsafe(
+                self._finish_authentication, connection, done, codecs, replying_to))
+
+    def _finish_authentication(self, connection: Connection, future: Future, codecs: Optional[list],
+                               replying_to: Optional[tuple] = None) -> None:
+        """
+        Completes a password check on the event loop once the worker pool has answered.
+
+        Args:
+            connection (Connection): The connection that requested authentication.
+            future (Future): The finished password check.
+            codecs (Optional[list]): Codec names the client supports, in order of preference.
+            replying_to (Optional[tuple]): The (client socket, request_id) of the authentication request, if it had an ID.
+        """
+        connection.auth_pending = False
+        if connection.closed:
+            return
+        try:
+            verified = future.result()
+        except Exception as e:
+            print(f"Password check failed: {e}")
+            verified = False
+
+        AUTHENTICATIONS.labels('password' if verified else 'invalid_password').inc()
+        previous, self._replying_to = self._replying_to, replying_to
+        try:
+            if verified:
+                # Attempts are counted before the check so guesses in flight are limited too; correct ones are refunded
+                connection.auth_attempts -= 1
+                self.authenticator.refund_attempt(connection.peer_host())
+                self._complete_authentication(connection, self.generate_unique_id('client'), codecs)
+            else:
+                response = {'type': 'authentication_failure', 'message': 'Invalid password'}
+                self.send_message_to_client(connection.socket, response)
+        finally:
+            # Called while handling the request itself, its reply is sent and must not be tagged again
+            if previous is not replying_to:
+                self._replying_to = previous
+
+    def _complete_authentication(self, connection: Connection, client_id: str, codecs: Optional[list]) -> None:
+        """
+        Binds a client identifier to an authenticated connection, tells the client
+        and switches the connection to the codec negotiated from its preferences.
+
+        Args:
+            connection (Connection): The authenticated connection.
+            client_id (str): The new or resumed client identifier.
+            codecs (Optional[list]): Codec names the client supports, in order of preference.
+        """
+        if connection.client_id is not None:
+            # Re-authenticating replaces the identity this connection had before
+            self.clients.pop(connection.client_id, None)
+            self.matchmaker.remove(connection.client_id)
+            game_id = self.player_games.get(connection.client_id)
+            if game_id is not None:
+                self.end_game(game_id, 'player_disconnected')
+        previous = self.clients.get(client_id)
+        if previous is not None:
+            # A resumed session takes over from the connection it was issued on
+            previous.client_id = None
+            self.disconnect_client(previous.socket)
+        connection.client_id = client_id
+        self.clients[client_id] = connection
+        if client_id not in self.player_games:
+            self.matchmaker.set_available(client_id)
+        response = {
+            'type': 'authentication_success',
+            'client_id': client_id,
+            'session_token': self.authenticator.issue_session(client_id),
+            'codec': negotiate_codec(codecs)
+        }
+        self._record({'event': 'session', 'token': response['session_token'], 'client_id': client_id,
+                      'expires_at': time.time() + self.authenticator.session_ttl})
+        # The reply still goes out in the old codec; everything after it uses the new one
+        self.send_message_to_client(connection.socket, response)
+        connection.protocol.set_codec(response['codec'])
 
     def generate_unique_id(self, id_type: str) -> str:
         """
@@ -153,23 +680,89 @@ class Server:
         """
         with self.lock:
             if id_type == 'client':
-                self.client_id_counter += 1
-                return f"client_{self.client_id_counter}"
+                self.client_id_counter += self.id_stride
+                # Interned so every game and index referencing the client shares one string
+                return sys.intern(f"client_{self.client_id_counter}")
             elif id_type == 'game':
-                self.game_id_counter += 1
+                self.game_id_counter += self.id_stride
                 return f"game_{self.game_id_counter}"
             else:
                 raise ValueError("Unknown ID type specified.")
 
-    def get_opponents_list(self, request_client_id: str) -> list:
+    def get_opponents_list(self, request_client_id: str, offset: int = 0,
+                           limit: int = Matchmaker.DEFAULT_PAGE_SIZE, prefix: str = '') -> tuple:
+        """
+        Retrieves one page of opponents that are connected and not in a game.
+
+        Args:
+            request_client_id (str): The identifier of the client asking, left out of the list.
+            offset (int): The number of opponents to skip.
+            limit (int): The largest number of opponents to return.
+            prefix (str): Only list opponents whose identifier starts with this prefix.
+
+        Returns:
+            tuple: (list of client identifiers, offset of the next page or None if this is the last one).
+        """
+        return self.matchmaker.list_available(request_client_id, offset, limit, prefix)
+
+    def find_match(self, client_socket: socket.socket, word: str) -> None:
+        """
+        Pairs the client with the player that has waited longest for a match and
+        starts their game, or queues the client until another player asks.
+        The player who waited picks the word; the one who completes the pair guesses it.
+
+        Args:
+            client_socket (socket.socket): The client's socket connection.
+            word (str): The word the client wants the opponent to guess if it ends up waiting.
+        """
+        client_id = self.get_client_id(client_socket)
+        if client_id is None or client_id in self.player_games:
+            response = {'type': 'error', 'message': 'Only players that are not in a game can find a match'}
+            self.send_message_to_client(client_socket, response)
+            return
+        error = self.check_word(word)
+        if error is not None:
+            response = {'type': 'error', 'message': error}
+            self.send_message_to_client(client_socket, response)
+            return
+
+        match = self.matchmaker.enqueue(client_id, word)
+        if match is None:
+            response = {'type': 'match_queued'}
+            self.send_message_to_client(client_socket, response)
+            return
+        waiting_id, waiting_word = match
+        self.start_match(waiting_id, waiting_word, client_id, word)
+
+    def start_match(self, waiting_id: str, waiting_word: str, client_id: str, word: str) -> None:
         """
-        Retrieves a list of available opponents.
+        Starts the game of a pair found by the matchmaker.
+
+        Args:
+            waiting_id (str): The player who waited, and picked the word.
+            waiting_word (str): The word the waiting player picked.
+            client_id (str): The player whose find_match completed the pair, and guesses the word.
+            word (str): The word that player would have picked had they waited.
+        """
+        self.initiate_game(waiting_id, client_id, waiting_word)
+
+    def check_word(self, word) -> Optional[str]:
+        """
+        Checks that a word picked for an opponent can be guessed.
+
+        Args:
+            word: The word as received from the client.
 
         Returns:
-            list: A list of client identifiers.
+            Optional[str]: Why the word is rejected, or None if it is acceptable.
         """
-        opponents = [client_id for client_id in self.clients.keys() if client_id != request_client_id]
-        return list(opponents)
+        if not isinstance(word, str) or not word:
+            return 'A word to guess is required'
+        if not word.isalpha():
+            return 'The word must be made of letters'
+        if self.dictionary is not None and word not in self.dictionary:
+            return 'The word is not in the dictionary'
+        return None
 
     def initiate_game(self, client_id: str, opponent_id: str, word: str) -> None:
         """
@@ -180,38 +773,457 @@ class Server:
             opponent_id (str): The identifier of the opponent.
             word (str): The word to be guessed in the game.
         """
-        if opponent_id in self.games:
+        if opponent_id == client_id:
+            response = {'type': 'error', 'message': 'You cannot play against yourself'}
+            self.notify_players([client_id], response)
+            return
+        if client_id in self.player_games:
+            response = {'type': 'error', 'message': 'You are already in a game'}
+            self.notify_players([client_id], response)
+            return
+        if opponent_id in self.player_games:
             response = {'type': 'error', 'message': 'Opponent is already in a game'}
-            self.send_message_to_client(self.clients[client_id], response)
+            self.notify_players([client_id], response)
             return
         game_id = self.generate_unique_id('game')
-        self.games[game_id] = Game()
-        self.games[game_id].start_game(client_id, opponent_id, word)
-        response = {'type': 'game_started', 'game_id': game_id}
-        self.send_message_to_client(self.clients[client_id], response)
-        self.send_message_to_client(self.clients[opponent_id], response)
+        game = Game()
+        game.start_game(client_id, opponent_id, word)
+        self.snapshots.publish(game_id, game)
+        self.games.add(game_id, game)
+        self.player_games[client_id] = game_id
+        self.player_games[opponent_id] = game_id
+        self.matchmaker.set_busy(client_id)
+        self.matchmaker.set_busy(opponent_id)
+        self.timers.call_later(self.game_idle_timeout, self._check_game_idle, game_id)
+        self._record({'event': 'started', 'game_id': game_id, 'word': game.word,
+                      'player1': client_id, 'player2': opponent_id})
+        response = {'type': 'game_started', 'game_id': game_id, 'player1': client_id, 'player2': opponent_id,
+                    'word_length': game.word_length}
+        self.notify_players([client_id, opponent_id], response)
+        self.events.publish(game_id, response)
+
+    def notify_players(self, client_ids: list, message: dict) -> None:
+        """
+        Pushes a message to every listed player that is currently connected.
+        Players that have disconnected are skipped.
+
+        Args:
+            client_ids (list): The identifiers of the players to notify.
+            message (dict): The message to push.
+        """
+        connections = (self.clients.get(client_id) for client_id in client_ids)
+        self.broadcast([connection.socket for connection in connections if connection is not None], message)
+
+    def broadcast(self, client_sockets: Iterable, message: dict) -> None:
+        """
+        Queues the same message for several clients, encoding it once for each
+        codec in use among them rather than once for each client. The frame is
+        immutable, so every send queue holds the same bytes object. The client
+        whose request is being answered gets its own copy carrying the request_id
+        if this is the reply to it.
+
+        Args:
+            client_sockets (Iterable): The recipients' socket connections.
+            message (dict): The message to send.
+        """
+        frames = {}  # codec: frame encoded with it
+        for client_socket in client_sockets:
+            connection = self.connections.get(client_socket)
+            if connection is None or connection.closed or (
+                    self._replying_to is not None and self._replying_to[0] is client_socket):
+                self.send_message_to_client(client_socket, message)
+                continue
+            if connection.overflowed:
+                SLOW_CLIENTS.labels('dropped').inc()
+                continue
+            codec = connection.protocol.codec
+            frame = frames.get(codec)
+            if frame is None:
+                frame = frames[codec] = connection.protocol.encode_message(message)
+            self._queue_frame(connection, frame)
 
     def send_message_to_client(self, client_socket: socket.socket, message: dict) -> None:
         """
-        Sends a message to the client.
+        Queues a message for the client. Queued messages are written by the
+        event loop at the end of its current iteration, or once the socket is
+        writable again if it could not take them all. Never blocks.
+
+        A client whose send queue is full, because it stopped reading, loses the
+        message or its connection, depending on slow_client_policy.
 
         Args:
             client_socket (socket.socket): The client's socket connection.
             message (dict): The message to send.
         """
-        try:
-            encoded_message = self.protocol.encode_message(message)
-            client_socket.sendall(encoded_message)
-        except socket.error as e:
-            print(f"Failed to send message to client: {e}")
+        connection = self.connections.get(client_socket)
+        if connection is None or connection.closed:
+            print("Failed to send message to client: connection is closed")
+            SEND_FAILURES.labels('connection_closed').inc()
+            return
+        if connection.overflowed:
+            SLOW_CLIENTS.labels('dropped').inc()
+            return
+        if self._replying_to is not None:
+            message = self._tag_reply(client_socket, message)
+        self._queue_frame(connection, connection.protocol.encode_message(message))
 
-    def end_game(self, game_id: str) -> None:
+    def _queue_frame(self, connection: Connection, frame: bytes) -> None:
         """
-        Ends the game with the specified identifier.
+        Queues an encoded frame for a client and schedules the flush, applying
+        slow_client_policy if the client's send queue is full.
+
+        Args:
+            connection (Connection): The recipient's open connection.
+            frame (bytes): The encoded frame.
+        """
+        if not connection.queue(frame):
+            if self.slow_client_policy == 'drop':
+                SLOW_CLIENTS.labels('dropped').inc()
+                return
+            SLOW_CLIENTS.labels('disconnected').inc()
+            # Disconnecting ends the client's game, which must not happen while a
+            # caller holds that game's lock, so it waits for the flush
+            connection.overflowed = True
+            self._flush_queue.append(connection)
+        elif len(connection.outgoing) == 1:
+            # The queue was empty, so the connection is neither waiting for writability nor queued for a flush
+            self._flush_queue.append(connection)
+
+    def end_game(self, game_id: str, reason: str = 'ended') -> None:
+        """
+        Ends the game with the specified identifier, frees both players for a
+        new game and tells whichever of them is still connected.
 
         Args:
             game_id (str): The unique identifier for the game.
+            reason (str): Why the game ended, e.g. 'guessed', 'player_disconnected' or 'idle_timeout'.
+        """
+        game = self.games.remove(game_id)
+        if game is None:
+            return
+        game.state = self.END_STATES.get(reason, GameState.ABANDONED)
+        self.snapshots.retire(game_id, game)
+        self._record({'event': 'finished', 'game_id': game_id})
+        players = [game.player1, game.player2]
+        for player_id in players:
+            if self.player_games.get(player_id) == game_id:
+                del self.player_games[player_id]
+                if player_id in self.clients:
+                    self.matchmaker.set_available(player_id)
+        response = {'type': 'game_over', 'game_id': game_id, 'attempts': game.attempts, 'reason': reason}
+        self.notify_players(players, response)
+        self.events.publish(game_id, response)
+
+    def add_hint_from_web(self, game_id: str, hint: str) -> Optional[str]:
+        """
+        Adds a hint submitted through the web interface, pushes it to the
+        guessing player and publishes it to spectators. Safe to call from any thread.
+
+        Args:
+            game_id (str): The unique identifier for the game.
+            hint (str): The hint to add.
+
+        Returns:
+            Optional[str]: None if the hint was added, otherwise why not.
+        """
+        return self.add_hints_from_web([(game_id, hint)])[0]
+
+    def add_hints_from_web(self, hints: list) -> list:
+        """
+        Adds a batch of hints submitted through the web interface. The pushes to
+        the guessing players are handed to the event loop in a single callback.
+        Safe to call from any thread.
+
+        Args:
+            hints (list): (game_id, hint) pairs, applied in order.
+
+        Returns:
+            list: For each pair, None if the hint was added, otherwise why not.
+        """
+        results = []
+        pushes = []
+        for game_id, hint in hints:
+            with self.games.locked(game_id) as game:
+                error = 'Game not found' if game is None else game.add_hint(hint)
+                if error is not None:
+                    results.append(error)
+                    continue
+                opponent_id = game.get_opponent()
+                self.snapshots.publish(game_id, game)
+                self._record({'event': 'hint', 'game_id': game_id, 'hint': hint, 'hint_count': game.hint_count})
+            results.append(None)
+            pushes.append((opponent_id, {'type': 'hint_received', 'hint': hint}))
+            self.events.publish(game_id, {'type': 'hint_added', 'game_id': game_id, 'hint': hint})
+        if pushes:
+            self.call_soon_threadsafe(self._push_hints, pushes)
+        return results
+
+    def _push_hints(self, pushes: list) -> None:
+        """
+        Sends hints added from the web to their guessing players.
+
+        Args:
+            pushes (list): (client_id, hint_received message) pairs.
+        """
+        for client_id, message in pushes:
+            self.notify_players([client_id], message)
+
+    def _check_game_idle(self, game_id: str) -> None:
+        """
+        Ends a game nobody has touched for game_idle_timeout seconds, or checks again
+        when it would next become idle.
+
+        Args:
+            game_id (str): The unique identifier for the game.
+        """
+        game = self.games.get(game_id)
+        if game is None:
+            return
+        idle_for = time.monotonic() - game.last_activity
+        if idle_for >= self.game_idle_timeout:
+            self.end_game(game_id, 'idle_timeout')
+        else:
+            self.timers.call_later(self.game_idle_timeout - idle_for, self._check_game_idle, game_id)
+
+    def _record(self, record: dict) -> None:
+        """
+        Appends a record to the game store's log, if the server has one. Safe to call from any thread.
+
+        Args:
+            record (dict): The record, as read back by RecoveredState.apply.
+        """
+        if self.store is not None:
+            self.store.append(record)
+
+    def _restore_state(self) -> None:
+        """
+        Restores the games and sessions the store kept from an earlier run, then
+        starts persisting new changes. Players of a restored game get it back by
+        resuming their session.
+        """
+        started = time.perf_counter()
+        state = self.store.load()
+        for game_id, fields in state.games.items():
+            game = Game.restore(fields['player1'], fields['player2'], fields['word'], fields['attempts'],
+                                fields['hints'], fields['hint_count'])
+            self.snapshots.publish(game_id, game)
+            self.games.add(game_id, game)
+            self.player_games[game.player1] = game_id
+            self.player_games[game.player2] = game_id
+            self.timers.call_later(self.game_idle_timeout, self._check_game_idle, game_id)
+        for token, (client_id, expires_at) in state.sessions.items():
+            self.authenticator.restore_session(token, client_id, expires_at)
+        self.client_id_counter = max(self.client_id_counter, state.client_id_counter)
+        self.game_id_counter = max(self.game_id_counter, state.game_id_counter)
+        self.store.start(self._persistent_state)
+        print(f"Restored {len(state.games)} games and {len(state.sessions)} sessions "
+              f"in {time.perf_counter() - started:.3f}s")
+
+    def _persistent_state(self) -> dict:
+        """
+        Collects the state the game store snapshots. Called from the store's
+        writer thread, so it reads only published snapshots and copies.
+
+        Returns:
+            dict: The games, sessions and ID counters, as GameStore.start expects them.
+        """
+        games = []
+        for snapshot in self.snapshots.active():
+            data = snapshot.data
+            games.append({'game_id': snapshot.game_id, 'word': data['word'], 'player1': data['player1'],
+                          'player2': data['player2'], 'attempts': data['attempts'], 'hints': data['hints'],
+                          'hint_count': data['hint_count']})
+        return {'games': games, 'sessions': self.authenticator.sessions(),
+                'client_id_counter': self.client_id_counter, 'game_id_counter': self.game_id_counter}
+
+    @staticmethod
+    def _request_of(client_socket, message: dict) -> Optional[tuple]:
+        """
+        Returns what replies to a message need to echo its request_id, if it has a valid one.
+
+        Args:
+            client_socket: The socket, or other handle, the message came from.
+            message (dict): The decoded message.
+
+        Returns:
+            Optional[tuple]: (client_socket, request_id), or None if the message has no integer or string request_id.
+        """
+        request_id = message.get('request_id')
+        if request_id is None or type(request_id) not in (int, str):
+            return None
+        return client_socket, request_id
+
+    def _tag_reply(self, client_socket, message: dict) -> dict:
+        """
+        Adds the request_id of the request being processed to the first message
+        sent back to the client that made it, its reply. Every later message,
+        and every message to anyone else, is a push and goes out untagged.
+
+        Args:
+            client_socket: The recipient's socket, or other handle.
+            message (dict): The message to send.
+
+        Returns:
+            dict: The message, copied with a request_id if it is a reply.
+        """
+        if self._replying_to is None or self._replying_to[0] is not client_socket:
+            return message
+        request_id = self._replying_to[1]
+        self._replying_to = None
+        return dict(message, request_id=request_id)
+
+    def _flush_queued(self) -> None:
+        """
+        Flushes every connection that had frames queued since the last flush,
+        and disconnects the clients whose send queue overflowed.
+        """
+        while self._flush_queue:
+            # Disconnecting a client can queue game_over messages for other clients
+            queued, self._flush_queue = self._flush_queue, []
+            for connection in queued:
+                if connection.closed:
+                    continue
+                if connection.overflowed:
+                    print(f"Disconnecting client {connection.client_id}: it is not reading its messages")
+                    self.disconnect_client(connection.socket)
+                else:
+                    self.flush_client(connection)
+
+    def _schedule_liveness_check(self, connection: Connection) -> None:
+        """
+        Makes sure the connection's liveness check runs by its next deadline:
+        a heartbeat, an idle timeout or the read timeout of a partial frame.
+        Each connection has at most one timer, moved only when a deadline
+        comes earlier than it.
+
+        Args:
+            connection (Connection): The connection to check.
+        """
+        deadlines = []
+        if self.heartbeat_interval is not None and not connection.ping_sent:
+            deadlines.append(connection.last_received + self.heartbeat_interval)
+        if self.idle_timeout is not None:
+            deadlines.append(connection.last_received + self.idle_timeout)
+        if self.read_timeout is not None and connection.partial_since is not None:
+            deadlines.append(connection.partial_since + self.read_timeout)
+        if not deadlines:
+            return
+        when = min(deadlines)
+        timer = connection.liveness_timer
+        if timer is not None and not timer.cancelled:
+            if timer.when <= when:
+                return
+            self.timers.cancel(timer)
+        connection.liveness_timer = self.timers.call_later(max(0.0, when - time.monotonic()),
+                                                           self._check_liveness, connection)
+
+    def _check_liveness(self, connection: Connection) -> None:
+        """
+        Pings a client that went quiet and disconnects one that stayed silent
+        for idle_timeout or stalled in the middle of a frame for read_timeout,
+        ending its game. Scheduled through the timer queue, so a connection
+        costs nothing between checks.
+
+        Args:
+            connection (Connection): The connection to check.
+        """
+        connection.liveness_timer = None
+        if connection.closed:
+            return
+        now = time.monotonic()
+        reason = None
+        if self.read_timeout is not None and connection.partial_since is not None \
+                and now - connection.partial_since >= self.read_timeout:
+            reason = 'read_timeout'
+        elif self.idle_timeout is not None and now - connection.last_received >= self.idle_timeout:
+            reason = 'idle_timeout'
+        if reason is not None:
+            print(f"Disconnecting client {connection.client_id or connection.address}: {reason.replace('_', ' ')}")
+            REAPED_CONNECTIONS.labels(reason).inc()
+            self.disconnect_client(connection.socket)
+            return
+        if self.heartbeat_interval is not None and not connection.ping_sent \
+                and now - connection.last_received >= self.heartbeat_interval:
+            connection.ping_sent = True
+            self.send_message_to_client(connection.socket, {'type': 'ping'})
+        self._schedule_liveness_check(connection)
+
+    def _setup_event_loop(self) -> None:
+        """
+        Registers additional sockets with the selector before the event loop
+        starts. Does nothing here; subclasses such as worker processes use it.
+        """
+
+    def _register_gauges(self) -> None:
+        """
+        Points the server gauges at this server. They are read when metrics are
+        collected, usually from a web thread, so they only take snapshots.
+        """
+        CONNECTIONS.set_function(lambda: len(self.connections))
+        CLIENTS.set_function(lambda: len(self.clients))
+        ACTIVE_GAMES.set_function(lambda: len(self.games))
+        OUTGOING_BYTES.set_function(
+            lambda: sum(connection.outgoing_bytes for connection in list(self.connections.values())))
+        OUTGOING_FRAMES.set_function(lambda: sum(len(connection.outgoing) for connection in list(self.connections.values())))
+        LARGEST_OUTGOING_QUEUE.set_function(
+            lambda: max((connection.outgoing_bytes for connection in list(self.connections.values())), default=0))
+        PENDING_CALLBACKS.set_function(lambda: len(self._callbacks))
+        PENDING_TIMERS.set_function(lambda: len(self.timers))
+        PENDING_AUTHENTICATIONS.set_function(lambda: self.authenticator.pending)
+
+    def _wakeup(self) -> None:
+        """
+        Interrupts a blocking select() call from another thread.
+        """
+        if self._wakeup_writer is None:
+            return
+        try:
+            self._wakeup_writer.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _drain_wakeup(self) -> None:
+        """
+        Empties the wakeup socket after the event loop has been interrupted.
+        """
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _run_callbacks(self) -> None:
+        """
+        Runs the callbacks other threads scheduled with call_soon_threadsafe.
+        """
+        while self._callbacks:
+            callback, args = self._callbacks.popleft()
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in scheduled callback: {e}")
+
+    def _close_all(self) -> None:
+        """
+        Closes every client connection, the listening sockets and the selector.
         """
-        if game_id in self.games:
-            del self.games[game_id]
-            # Additional cleanup and notification to clients can be added here
+        if self.store is not None:
+            # Closed first so the games ended by disconnecting everyone below are
+            # not persisted as finished, and can resume on the next start
+            self.store.close()
+        if self.selector:
+            self._flush_queued()
+        for client_socket in list(self.connections):
+            self.disconnect_client(client_socket)
+        for listener, transport in self.listeners.items():
+            listener.close()
+            transport.close()
+        self.listeners = {}
+        for sock in (self._wakeup_reader, self._wakeup_writer):
+            if sock:
+                sock.close()
+        self._wakeup_reader = self._wakeup_writer = None
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+        self.authenticator.shutdown()
@@ -0,0 +1,195 @@
+## snapshots.py
+import json
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Optional
+from game import Game
+
+class GameSnapshot:
+    """
+    The GameSnapshot class is an immutable, versioned copy of a game's public
+    state. Its JSON body is rendered on first use and then shared by every
+    reader of that version.
+    """
+
+    __slots__ = ('game_id', 'version', 'data', 'etag', '_body')
+
+    def __init__(self, game_id: str, version: int, data: dict):
+        """
+        Initializes the snapshot.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+            version (int): The version number, increased on every change to the game.
+            data (dict): The game state; it must not be modified afterwards.
+        """
+        self.game_id = game_id
+        self.version = version
+        self.data = data
+        self.etag = f'"{game_id}-{version}"'
+        self._body = None
+
+    @property
+    def body(self) -> bytes:
+        """
+        Returns the snapshot rendered as UTF-8 encoded JSON.
+        """
+        body = self._body
+        if body is None:
+            # Two threads rendering at once produce the same bytes, so no lock is needed
+            body = self._body = json.dumps(self.data).encode('utf-8')
+        return body
+
+
+class SnapshotStore:
+    """
+    The SnapshotStore class holds the latest snapshot of every active game,
+    plus the final snapshot of recently finished games. The game server
+    publishes a new snapshot whenever a game changes; readers such as the web
+    interface only ever do a dictionary lookup, so they take no lock and
+    never wait for the server.
+
+    Active games are also kept in the order they started, each under an
+    increasing sequence number, so they can be listed page by page with a
+    cursor that stays valid while games start and end.
+    """
+
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+
+    def __init__(self, finished_retention: int = 1024):
+        """
+        Initializes an empty store.
+
+        Args:
+            finished_retention (int): How many finished games keep their final snapshot.
+        """
+        self.finished_retention = finished_retention
+        self._active = {}  # game_id: GameSnapshot
+        self._finished = OrderedDict()  # game_id: GameSnapshot, oldest first
+        self._order = []  # (sequence, game_id) of games in start order, including ended ones until compacted
+        self._sequence = 0
+        self._ended_in_order = 0
+
+    def publish(self, game_id: str, game: Game) -> GameSnapshot:
+        """
+        Publishes the current state of a game as its next version. Callers must
+        hold the game's registry lock so versions of one game never race.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+            game (Game): The game to copy.
+
+        Returns:
+            GameSnapshot: The published snapshot.
+        """
+        previous = self._active.get(game_id)
+        if previous is None:
+            self._sequence += 1
+            self._order.append((self._sequence, game_id))
+        snapshot = GameSnapshot(game_id, previous.version + 1 if previous else 1, {
+            'game_id': game_id,
+            'word': game.word,
+            'hints': game.hints,
+            'attempts': game.attempts,
+            'player1': game.player1,
+            'player2': game.player2,
+            'state': game.state.name.lower(),
+            'hint_count': game.hint_count
+        })
+        # A single dict assignment swaps the version readers see
+        self._active[game_id] = snapshot
+        return snapshot
+
+    def retire(self, game_id: str, game: Game) -> None:
+        """
+        Publishes the final state of a finished game and keeps it among the
+        finished snapshots until finished_retention newer games have ended.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+            game (Game): The finished game.
+        """
+        snapshot = self.publish(game_id, game)
+        self._finished[game_id] = snapshot
+        del self._active[game_id]
+        while len(self._finished) > self.finished_retention:
+            self._finished.popitem(last=False)
+        self._ended_in_order += 1
+        if self._ended_in_order > len(self._active):
+            # Swapping in a new list keeps readers iterating the old one safe
+            self._order = [entry for entry in self._order if entry[1] in self._active]
+            self._ended_in_order = 0
+
+    def get(self, game_id: str) -> Optional[GameSnapshot]:
+        """
+        Returns the latest snapshot of an active or recently finished game.
+
+        Args:
+            game_id (str): The unique identifier of the game.
+
+        Returns:
+            Optional[GameSnapshot]: The snapshot, or None if the game is unknown.
+        """
+        snapshot = self._active.get(game_id)
+        if snapshot is None:
+            snapshot = self._finished.get(game_id)
+        return snapshot
+
+    def active(self) -> list:
+        """
+        Returns the latest snapshot of every active game. Safe to call from any thread.
+
+        Returns:
+            list: The GameSnapshot of each active game.
+        """
+        return list(self._active.values())
+
+    def get_many(self, game_ids: list) -> tuple:
+        """
+        Looks up the latest snapshots of several games at once.
+
+        Args:
+            game_ids (list): The unique identifiers of the games.
+
+        Returns:
+            tuple: (list of GameSnapshot in request order, list of unknown game identifiers).
+        """
+        found = []
+        missing = []
+        for game_id in game_ids:
+            snapshot = self.get(game_id)
+            if snapshot is None:
+                missing.append(game_id)
+            else:
+                found.append(snapshot)
+        return found, missing
+
+    def list_active(self, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> tuple:
+        """
+        Returns one page of active games in the order they started.
+
+        Args:
+            cursor (int): The cursor returned with the previous page, or 0 for the first page.
+            limit (int): The largest page to return, capped at MAX_PAGE_SIZE.
+
+        Returns:
+            tuple: (list of GameSnapshot, cursor of the next page or None if this is the last one).
+        """
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        order = self._order
+        page = []
+        page_end = cursor
+        for index in range(bisect_left(order, (cursor + 1,)), len(order)):
+            sequence, game_id = order[index]
+            snapshot = self._active.get(game_id)
+            if snapshot is None:
+                continue
+            if len(page) == limit:
+                return page, page_end
+            page.append(snapshot)
+            page_end = sequence
+        return page, None
+
+    def __len__(self) -> int:
+        return len(self._active)
@@ -0,0 +1,98 @@
+## timers.py
+import heapq
+import itertools
+import time
+from typing import Callable, Optional
+
+class Timer:
+    """
+    The Timer class is a handle to a callback scheduled on a TimerQueue.
+    Cancel it through TimerQueue.cancel so the queue can track it.
+    """
+
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerQueue:
+    """
+    The TimerQueue class keeps every pending deadline of the server in a
+    single heap ordered by due time, so the event loop can sleep exactly until
+    the next one instead of each deadline needing a thread or a periodic scan.
+    It is not thread-safe; it is only used from the event loop thread.
+    """
+
+    def __init__(self):
+        self._heap = []  # (due time, sequence number, Timer)
+        self._sequence = itertools.count()
+        self._cancelled = 0
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """
+        Schedules a callback to run after a delay.
+
+        Args:
+            delay (float): The delay in seconds.
+            callback (Callable): The function to call.
+            *args: The arguments to call it with.
+
+        Returns:
+            Timer: A handle that can cancel the callback.
+        """
+        timer = Timer(time.monotonic() + delay, callback, args)
+        heapq.heappush(self._heap, (timer.when, next(self._sequence), timer))
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        """
+        Cancels a scheduled callback and compacts the heap once most of it is cancelled.
+
+        Args:
+            timer (Timer): The handle returned by call_later.
+        """
+        if timer.cancelled:
+            return
+        timer.cancelled = True
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def next_timeout(self) -> Optional[float]:
+        """
+        Returns how long the event loop may block before the next deadline.
+
+        Returns:
+            Optional[float]: Seconds until the earliest timer is due, or None if there are none.
+        """
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def run_expired(self) -> None:
+        """
+        Runs every callback whose deadline has passed, in deadline order.
+        """
+        now = time.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            timer.cancelled = True  # Already ran, so a later cancel() is a no-op
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                print(f"Error in timer callback: {e}")
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
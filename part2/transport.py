@@ -0,0 +1,168 @@
+## transport.py
+import os
+import socket
+import stat
+
+class Transport:
+    """
+    The Transport class describes one kind of stream socket the server can
+    listen on and a client can connect over. The server's event loop only
+    deals with the sockets it returns, so every transport is served by the
+    same dispatch code.
+    """
+
+    name = 'transport'
+
+    def listen(self, backlog: int) -> socket.socket:
+        """
+        Creates a non-blocking listening socket.
+
+        Args:
+            backlog (int): The listen backlog.
+
+        Returns:
+            socket.socket: The listening socket.
+        """
+        raise NotImplementedError
+
+    def connect(self) -> socket.socket:
+        """
+        Creates a blocking socket connected to a server listening on this transport.
+
+        Returns:
+            socket.socket: The connected socket.
+        """
+        raise NotImplementedError
+
+    def configure(self, sock: socket.socket) -> None:
+        """
+        Applies per-connection socket options to an accepted or connected socket.
+
+        Args:
+            sock (socket.socket): The connection's socket.
+        """
+
+    def close(self) -> None:
+        """
+        Releases whatever the listener left behind once its socket is closed.
+        """
+
+    def describe(self) -> str:
+        raise NotImplementedError
+
+
+class TcpTransport(Transport):
+    """
+    TCP over IPv4, for clients on other hosts.
+    """
+
+    name = 'tcp'
+
+    def __init__(self, host: str = 'localhost', port: int = 12345, reuse_port: bool = False):
+        """
+        Initializes the transport.
+
+        Args:
+            host (str): The host to listen on or connect to.
+            port (int): The TCP port.
+            reuse_port (bool): Let several processes listen on the port, with the kernel spreading connections across them.
+        """
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+
+    def listen(self, backlog: int) -> socket.socket:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(backlog)
+        listener.setblocking(False)
+        return listener
+
+    def connect(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port))
+        self.configure(sock)
+        return sock
+
+    def configure(self, sock: socket.socket) -> None:
+        # Messages are small request/reply frames, so don't hold them back waiting for an ACK
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def describe(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+class UnixTransport(Transport):
+    """
+    UNIX domain stream sockets, for clients on the same host. They skip the
+    TCP/IP stack entirely, which lowers latency and CPU cost per message.
+    """
+
+    name = 'unix'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._listening = False
+
+    def listen(self, backlog: int) -> socket.socket:
+        self._remove_stale_socket()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen(backlog)
+        listener.setblocking(False)
+        self._listening = True
+        return listener
+
+    def connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def close(self) -> None:
+        if self._listening:
+            self._listening = False
+            self._remove_stale_socket()
+
+    def describe(self) -> str:
+        return f"unix:{self.path}"
+
+    def _remove_stale_socket(self) -> None:
+        """
+        Removes a socket file left by an earlier server, refusing to delete anything that is not a socket.
+        """
+        try:
+            mode = os.stat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(f"{self.path} exists and is not a socket")
+        os.unlink(self.path)
+
+
+def create_transport(server_type: str, host: str = 'localhost', port: int = 12345, path: str = None) -> Transport:
+    """
+    Creates the transport named by server_type.
+
+    Args:
+        server_type (str): 'tcp' or 'unix'.
+        host (str): The TCP host.
+        port (int): The TCP port.
+        path (str): The UNIX socket path.
+
+    Returns:
+        Transport: The transport.
+    """
+    if server_type == 'tcp':
+        return TcpTransport(host, port)
+    elif server_type == 'unix':
+        if not path:
+            raise ValueError("A socket path is required for the unix transport.")
+        return UnixTransport(path)
+    else:
+        raise ValueError(f"Unknown server type: {server_type}")
@@ -1,35 +1,185 @@
 ## web_interface.py
-from flask import Flask, jsonify, request
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request
 from typing import Callable, Optional
+from werkzeug.serving import BaseWSGIServer
+from events import ALL_GAMES, EventBus, Subscription
+from snapshots import GameSnapshot
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    The PooledWSGIServer class serves each HTTP connection on a fixed pool of
+    worker threads instead of the single thread of Flask's development server,
+    so slow clients cannot hold up everyone else and load never spawns an
+    unbounded number of threads.
+
+    Requests for long-lived event streams would hold a pool thread for as long
+    as they stay open, so they are handed to threads of their own, at most
+    max_streams at once; further streams are refused with 503.
+    """
+
+    # Bytes peeked at to read the request line, and seconds a client has to send it
+    PEEK_BYTES = 1024
+    PEEK_TIMEOUT = 10.0
+    STREAMS_FULL = (b'HTTP/1.0 503 Service Unavailable\r\nContent-Type: application/json\r\n'
+                    b'Retry-After: 5\r\nContent-Length: 35\r\n\r\n{"error": "Too many event streams"}')
+
+    def __init__(self, host: str, port: int, app, workers: int = 8, max_streams: int = 64,
+                 is_stream: Optional[Callable[[str], bool]] = None):
+        """
+        Initializes the server.
+
+        Args:
+            host (str): The hostname to listen on.
+            port (int): The port to listen on.
+            app: The WSGI application.
+            workers (int): The number of threads serving ordinary requests.
+            max_streams (int): The most event streams served at once.
+            is_stream (Optional[Callable[[str], bool]]): Tells from a request path whether it opens an event stream.
+        """
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='web')
+        self.streams = threading.BoundedSemaphore(max_streams)
+        self.is_stream = is_stream
+
+    def process_request(self, request, client_address) -> None:
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address) -> None:
+        if self.is_stream is not None and self._is_stream_request(request):
+            if not self.streams.acquire(blocking=False):
+                try:
+                    request.sendall(self.STREAMS_FULL)
+                except OSError:
+                    pass
+                self.shutdown_request(request)
+                return
+            # Daemon threads, so an open stream never keeps the process alive
+            threading.Thread(target=self._serve_stream, args=(request, client_address),
+                             name='web-stream', daemon=True).start()
+            return
+        self._serve(request, client_address)
+
+    def _serve_stream(self, request, client_address) -> None:
+        try:
+            self._serve(request, client_address)
+        finally:
+            self.streams.release()
+
+    def _serve(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def _is_stream_request(self, request) -> bool:
+        """
+        Peeks at the request line, leaving it for the request handler to read,
+        and tells whether it asks for an event stream.
+        """
+        try:
+            request.settimeout(self.PEEK_TIMEOUT)
+            head = request.recv(self.PEEK_BYTES, socket.MSG_PEEK)
+            request.settimeout(None)
+        except OSError:
+            return False
+        method, _, rest = head.partition(b' ')
+        if method != b'GET':
+            return False
+        path = rest.split(b' ', 1)[0].split(b'?', 1)[0]
+        return self.is_stream(path.decode('latin-1'))
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
 
 class WebInterface:
     """
     The WebInterface class is responsible for providing a web-based interface
-    to interact with the game server. It uses Flask to run a simple web server.
+    to interact with the game server. It uses Flask for routing and serves
+    requests from a pool of worker threads.
+
+    Spectators can stream a game's events as Server-Sent Events instead of
+    polling. Streams are served on threads of their own, capped separately,
+    so spectators never take threads from ordinary requests.
     """
 
-    def __init__(self, get_game_data: Callable[[str], Optional[dict]], update_game_data: Callable[[str, str], bool]):
+    # Seconds between comment frames that keep idle streams (and proxies) alive
+    KEEPALIVE_INTERVAL = 15.0
+    # Longest a stream waits for events before checking whether the web interface is shutting down
+    CLOSE_CHECK_INTERVAL = 1.0
+    # Most games a single batch request may read or send hints to
+    MAX_BATCH_SIZE = 500
+    # What the hint callbacks return for a game that does not exist
+    GAME_NOT_FOUND = 'Game not found'
+
+    def __init__(self, get_game_data: Callable[[str], Optional[GameSnapshot]],
+                 update_game_data: Callable[[str, str], Optional[str]],
+                 event_bus: Optional[EventBus] = None,
+                 get_many_games: Optional[Callable[[list], tuple]] = None,
+                 list_active_games: Optional[Callable[[int, int], tuple]] = None,
+                 update_many_games: Optional[Callable[[list], list]] = None,
+                 render_metrics: Optional[Callable[[], str]] = None):
         """
         Initializes the WebInterface with callback functions to interact with the game server.
 
         Args:
-            get_game_data (Callable[[str], Optional[dict]]): Callback to get game data.
-            update_game_data (Callable[[str, str], bool]): Callback to update game data with a new hint.
+            get_game_data (Callable[[str], Optional[GameSnapshot]]): Callback to get the latest snapshot of a game.
+            update_game_data (Callable[[str, str], Optional[str]]): Callback adding a hint, returning why it was not added, if it was not.
+            event_bus (Optional[EventBus]): The bus the server publishes game events to; streaming is disabled without it.
+            get_many_games (Optional[Callable[[list], tuple]]): Callback returning (snapshots, missing ids) for a list of ids.
+            list_active_games (Optional[Callable[[int, int], tuple]]): Callback returning (snapshots, next cursor) for a cursor and limit.
+            update_many_games (Optional[Callable[[list], list]]): Callback adding a list of (game_id, hint) pairs, returning an error or None for each.
+            render_metrics (Optional[Callable[[], str]]): Callback returning metrics in the Prometheus text format.
         """
         self.app = Flask(__name__)
         self.get_game_data = get_game_data
         self.update_game_data = update_game_data
+        self.event_bus = event_bus
+        self.get_many_games = get_many_games
+        self.list_active_games = list_active_games
+        self.update_many_games = update_many_games
+        self.render_metrics = render_metrics
+        self.http_server = None
+        self._closing = threading.Event()
 
-    def run(self, host: str = 'localhost', port: int = 5000) -> None:
+    def run(self, host: str = 'localhost', port: int = 5000, workers: int = 8, max_streams: int = 64) -> None:
         """
-        Starts the Flask web server.
+        Starts the web server and serves requests until shutdown() is called.
 
         Args:
             host (str): The hostname to listen on. Defaults to 'localhost'.
             port (int): The port of the web server. Defaults to 5000.
+            workers (int): The number of threads serving ordinary requests. Defaults to 8.
+            max_streams (int): The most event streams open at once. Defaults to 64.
         """
         self._register_routes()
-        self.app.run(host=host, port=port)
+        self.http_server = PooledWSGIServer(host, port, self.app, workers, max_streams, self._is_event_stream)
+        print(f"Web interface started on http://{host}:{port}")
+        self.http_server.serve_forever()
+
+    def shutdown(self) -> None:
+        """
+        Stops a running web server and ends open event streams. Safe to call from any thread.
+        """
+        self._closing.set()
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+
+    @staticmethod
+    def _is_event_stream(path: str) -> bool:
+        """
+        Tells whether a request path is one of the event stream endpoints.
+        """
+        return path == '/events' or (path.startswith('/game/') and path.endswith('/events'))
 
     def _register_routes(self) -> None:
         """
@@ -38,7 +188,9 @@ class WebInterface:
         @self.app.route('/game/<game_id>', methods=['GET'])
         def get_game(game_id: str):
             """
-            Endpoint to get the current state of a game.
+            Endpoint to get the current state of a game. Responses carry the
+            snapshot version as an ETag, and a request whose If-None-Match
+            still matches the latest version is answered with 304 Not Modified.
 
             Args:
                 game_id (str): The unique identifier of the game.
@@ -46,12 +198,15 @@ class WebInterface:
             Returns:
                 Response: JSON containing the game state or error message.
             """
-            game_data = self.get_game_data(game_id)
-            if game_data:
-                return jsonify(game_data), 200
-            else:
+            snapshot = self.get_game_data(game_id)
+            if snapshot is None:
                 return jsonify({'error': 'Game not found'}), 404
 
+            headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+            if request.if_none_match.contains_weak(snapshot.etag.strip('"')):
+                return Response(status=304, headers=headers)
+            return Response(snapshot.body, status=200, mimetype='application/json', headers=headers)
+
         @self.app.route('/game/<game_id>/hint', methods=['POST'])
         def add_hint(game_id: str):
             """
@@ -63,11 +218,182 @@ class WebInterface:
             Returns:
                 Response: JSON containing the acknowledgement or error message.
             """
-            hint = request.json.get('hint')
-            if not hint:
+            hint = (request.get_json(silent=True) or {}).get('hint')
+            if hint is None:
                 return jsonify({'error': 'No hint provided'}), 400
 
-            if self.update_game_data(game_id, hint):
+            error = self.update_game_data(game_id, hint)
+            if error is None:
                 return jsonify({'message': 'Hint added successfully'}), 200
-            else:
+            elif error == self.GAME_NOT_FOUND:
                 return jsonify({'error': 'Failed to add hint or game not found'}), 404
+            else:
+                return jsonify({'error': error}), 400
+
+        @self.app.route('/metrics', methods=['GET'])
+        def get_metrics():
+            """
+            Endpoint exposing the server's metrics in the Prometheus text format.
+
+            Returns:
+                Response: The metrics as plain text, or an error message.
+            """
+            if self.render_metrics is None:
+                return jsonify({'error': 'Metrics are disabled'}), 404
+            return Response(self.render_metrics(), status=200, mimetype='text/plain; version=0.0.4')
+
+        @self.app.route('/games', methods=['GET'])
+        def get_games():
+            """
+            Endpoint to get several games in one request. With ?ids=a,b,c it
+            returns those games; without ids it lists active games one page at
+            a time, continuing from ?cursor= with at most ?limit= games.
+
+            Returns:
+                Response: JSON containing the games or error message.
+            """
+            ids = request.args.get('ids')
+            if ids is not None:
+                game_ids = [game_id for game_id in ids.split(',') if game_id]
+                if len(game_ids) > self.MAX_BATCH_SIZE:
+                    return jsonify({'error': f'At most {self.MAX_BATCH_SIZE} games per request'}), 400
+                if self.get_many_games is not None:
+                    snapshots, missing = self.get_many_games(game_ids)
+                else:
+                    snapshots, missing = [], []
+                    for game_id in game_ids:
+                        snapshot = self.get_game_data(game_id)
+                        if snapshot is None:
+                            missing.append(game_id)
+                        else:
+                            snapshots.append(snapshot)
+                return self._games_response(snapshots, {'missing': missing})
+
+            if self.list_active_games is None:
+                return jsonify({'error': 'Listing games is disabled'}), 404
+            cursor = request.args.get('cursor', 0, type=int)
+            limit = request.args.get('limit', 100, type=int)
+            snapshots, next_cursor = self.list_active_games(cursor, limit)
+            return self._games_response(snapshots, {'next_cursor': next_cursor})
+
+        @self.app.route('/games/hints', methods=['POST'])
+        def add_hints():
+            """
+            Endpoint to add hints to several games in one request. The body is
+            {"hints": [{"game_id": ..., "hint": ...}, ...]}.
+
+            Returns:
+                Response: JSON with whether each hint was added and why not, or an error message.
+            """
+            entries = (request.get_json(silent=True) or {}).get('hints')
+            if not isinstance(entries, list) or not entries:
+                return jsonify({'error': 'No hints provided'}), 400
+            if len(entries) > self.MAX_BATCH_SIZE:
+                return jsonify({'error': f'At most {self.MAX_BATCH_SIZE} hints per request'}), 400
+            hints = []
+            for entry in entries:
+                if not isinstance(entry, dict) or not isinstance(entry.get('game_id'), str) or 'hint' not in entry:
+                    return jsonify({'error': 'Each hint needs a game_id and a hint'}), 400
+                hints.append((entry['game_id'], entry['hint']))
+
+            if self.update_many_games is not None:
+                errors = self.update_many_games(hints)
+            else:
+                errors = [self.update_game_data(game_id, hint) for game_id, hint in hints]
+            results = []
+            for (game_id, _), error in zip(hints, errors):
+                result = {'game_id': game_id, 'added': error is None}
+                if error is not None:
+                    result['error'] = error
+                results.append(result)
+            return jsonify({'results': results}), 200
+
+        @self.app.route('/game/<game_id>/events', methods=['GET'])
+        def stream_game(game_id: str):
+            """
+            Endpoint to stream the events of one game as Server-Sent Events. The
+            stream opens with the current snapshot and ends after game_over.
+
+            Args:
+                game_id (str): The unique identifier of the game.
+
+            Returns:
+                Response: A text/event-stream response or a JSON error message.
+            """
+            if self.event_bus is None:
+                return jsonify({'error': 'Event streaming is disabled'}), 404
+            # Subscribing before reading the snapshot means no event can fall in between
+            subscription = self.event_bus.subscribe(game_id)
+            snapshot = self.get_game_data(game_id)
+            if snapshot is None:
+                self.event_bus.unsubscribe(subscription)
+                return jsonify({'error': 'Game not found'}), 404
+            finished = snapshot.data['state'] != 'active'
+            return self._event_stream(subscription, snapshot, finished)
+
+        @self.app.route('/events', methods=['GET'])
+        def stream_all():
+            """
+            Endpoint to stream the events of every game as Server-Sent Events.
+
+            Returns:
+                Response: A text/event-stream response or a JSON error message.
+            """
+            if self.event_bus is None:
+                return jsonify({'error': 'Event streaming is disabled'}), 404
+            return self._event_stream(self.event_bus.subscribe(ALL_GAMES))
+
+    def _games_response(self, snapshots: list, extra: dict) -> Response:
+        """
+        Builds a JSON response holding several snapshots. Each snapshot's cached
+        body is reused as is, so a batch never encodes a game again.
+
+        Args:
+            snapshots (list): The GameSnapshot objects to return.
+            extra (dict): Further top-level fields of the response.
+
+        Returns:
+            Response: The JSON response.
+        """
+        body = b'{"games": [' + b', '.join(snapshot.body for snapshot in snapshots) + b'], ' + json.dumps(extra)[1:].encode('utf-8')
+        return Response(body, status=200, mimetype='application/json', headers={'Cache-Control': 'no-cache'})
+
+    def _event_stream(self, subscription: Subscription, snapshot: Optional[GameSnapshot] = None,
+                      finished: bool = False) -> Response:
+        """
+        Builds a streaming response that writes a subscription's events until the
+        client goes away, the game ends or the web interface shuts down.
+
+        Args:
+            subscription (Subscription): The subscription to drain.
+            snapshot (Optional[GameSnapshot]): A snapshot to send before the first event.
+            finished (bool): Whether the stream should end right after the snapshot.
+
+        Returns:
+            Response: The text/event-stream response.
+        """
+        def generate():
+            try:
+                if snapshot is not None:
+                    yield b'event: snapshot\ndata: ' + snapshot.body + b'\n\n'
+                    if finished:
+                        return
+                single_game = subscription.topic != ALL_GAMES
+                keepalive = time.monotonic() + self.KEEPALIVE_INTERVAL
+                while not self._closing.is_set():
+                    events = subscription.get(self.CLOSE_CHECK_INTERVAL)
+                    if not events:
+                        if time.monotonic() >= keepalive:
+                            keepalive = time.monotonic() + self.KEEPALIVE_INTERVAL
+                            yield b': keepalive\n\n'
+                        continue
+                    keepalive = time.monotonic() + self.KEEPALIVE_INTERVAL
+                    # Frames are encoded once per event and shared by every spectator
+                    yield b''.join(event.frame for event in events)
+                    if single_game and events[-1].data['type'] == 'game_over':
+                        return
+            finally:
+                self.event_bus.unsubscribe(subscription)
+
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        return Response(generate(), mimetype='text/event-stream', headers=headers)
@@ -0,0 +1,660 @@
+## workers.py
+import multiprocessing
+import selectors
+import signal
+import socket
+import sys
+from typing import Optional
+from connection import Connection
+from game import Game
+from matchmaking import Matchmaker
+from server import Server
+from transport import TcpTransport
+
+class RemoteClient:
+    """
+    The RemoteClient class stands in for the socket of a client connected to
+    another worker when a request is forwarded to the worker that owns the
+    game. Replies sent to it travel back to that worker over IPC.
+    """
+
+    __slots__ = ('client_id', 'worker')
+
+    def __init__(self, client_id: str, worker: int):
+        self.client_id = client_id
+        self.worker = worker
+
+
+class PendingGame:
+    """
+    A game waiting for the workers of both players to confirm they are free.
+    """
+
+    __slots__ = ('player1', 'player2', 'word', 'match_word', 'replying_to', 'waiting', 'claimed', 'refused', 'cancelled')
+
+    def __init__(self, player1: str, player2: str, word: str, replying_to: Optional[tuple] = None,
+                 match_word: Optional[str] = None):
+        self.player1 = player1
+        self.player2 = player2
+        self.word = word
+        # Set when find_match paired the players: player2 asked for the match, with this word of their own
+        self.match_word = match_word
+        self.replying_to = replying_to  # The request that started the game, answered once the claims are in
+        self.waiting = {player1, player2}
+        self.claimed = []  # (client_id, worker) pairs that were reserved for the game
+        self.refused = []  # client_ids that could not join
+        self.cancelled = False
+
+
+class ClusterMatchmaker(Matchmaker):
+    """
+    The ClusterMatchmaker class is a Matchmaker that also tracks players of
+    other workers. Changes to the worker's own players are published to its
+    peers; changes received from peers are applied without publishing them again.
+    """
+
+    def __init__(self, publish):
+        """
+        Initializes the matchmaker.
+
+        Args:
+            publish (Callable[[str, str], None]): Called with (client_id, 'available' | 'busy' | 'gone') on every change.
+        """
+        super().__init__()
+        self.publish = publish
+
+    def set_available(self, client_id: str) -> None:
+        super().set_available(client_id)
+        self.publish(client_id, 'available')
+
+    def set_busy(self, client_id: str) -> None:
+        super().set_busy(client_id)
+        self.publish(client_id, 'busy')
+
+    def remove(self, client_id: str) -> None:
+        Matchmaker.set_busy(self, client_id)
+        self.publish(client_id, 'gone')
+
+    def apply_presence(self, client_id: str, state: str) -> None:
+        """
+        Applies a presence change published by another worker.
+
+        Args:
+            client_id (str): The identifier of the other worker's player.
+            state (str): 'available', 'busy' or 'gone'.
+        """
+        if state == 'available':
+            Matchmaker.set_available(self, client_id)
+        else:
+            Matchmaker.set_busy(self, client_id)
+
+
+class WorkerServer(Server):
+    """
+    The WorkerServer class is one of several server processes sharing a port
+    through SO_REUSEPORT. Client and game identifiers are numbered with a
+    stride of the worker count, so the number in an identifier tells which
+    worker created it; a game lives on the worker that created it.
+
+    Workers are connected pairwise by socketpairs carrying JSON frames:
+    - presence: a worker's player became available, busy or disconnected
+    - deliver: a message for a player connected to the receiving worker
+    - dispatch: a player's request for a game owned by the receiving worker,
+      or a matchmaking request for the coordinator (worker 0)
+    - claim / claim_result / release: reserving both players before a game starts
+    - end_game: end a game owned by the receiving worker
+    - resume_session / session_resumed: hand a player over to the worker they
+      reconnected to with a session token the receiving worker issued
+    """
+
+    COORDINATOR = 0
+
+    def __init__(self, index: int, worker_count: int, peers: dict, host: str = 'localhost', port: int = 12345, **options):
+        """
+        Initializes a worker.
+
+        Args:
+            index (int): This worker's number, from 0 to worker_count - 1.
+            worker_count (int): The number of workers.
+            peers (dict): worker number: connected socket, for every other worker.
+            host (str): The hostname to listen on.
+            port (int): The TCP port every worker listens on.
+            **options: Further keyword arguments for Server.
+        """
+        super().__init__(host, port, **options)
+        self.index = index
+        self.worker_count = worker_count
+        self.transports = [TcpTransport(host, port, reuse_port=True)]
+        self.id_stride = worker_count
+        # The first identifiers are index + 1, so (number - 1) % worker_count is the creating worker
+        self.client_id_counter = self.game_id_counter = index + 1 - worker_count
+        self.matchmaker = ClusterMatchmaker(self.publish_presence)
+        # Sessions live on the worker that issued them; the prefix tells a reconnecting client's new worker which one
+        self.authenticator.session_prefix = f"{index}."
+        self.peers = peers  # worker number: socket
+        self.peer_workers = {}  # socket: worker number
+        self.remote_clients = {}  # client_id: worker number, for players connected to other workers
+        self._pending_games = {}  # game_id: PendingGame
+        self._pending_resumes = {}  # session token: (connection, password, codecs, replying_to, issuing worker)
+
+    def owner_of(self, identifier: str) -> Optional[int]:
+        """
+        Returns the worker that created a client or game identifier.
+
+        Args:
+            identifier (str): An identifier such as 'game_12'.
+
+        Returns:
+            Optional[int]: The worker number, or None if the identifier is malformed.
+        """
+        try:
+            return (int(identifier.rsplit('_', 1)[1]) - 1) % self.worker_count
+        except (AttributeError, IndexError, ValueError):
+            return None
+
+    def issuer_of(self, session_token) -> Optional[int]:
+        """
+        Returns the worker that issued a session token, or None if the token is malformed.
+        """
+        try:
+            worker = int(session_token.split('.', 1)[0])
+        except (AttributeError, ValueError):
+            return None
+        return worker if 0 <= worker < self.worker_count else None
+
+    def locate(self, client_id: str) -> Optional[int]:
+        """
+        Returns the worker a player is connected to, or None if they are not connected.
+        """
+        if client_id in self.clients:
+            return self.index
+        return self.remote_clients.get(client_id)
+
+    def is_connected(self, client_id: str) -> bool:
+        return self.locate(client_id) is not None
+
+    def send_to_worker(self, worker: int, message: dict) -> None:
+        peer = self.peers.get(worker)
+        if peer is not None:
+            super().send_message_to_client(peer, message)
+
+    def publish_presence(self, client_id: str, state: str) -> None:
+        """
+        Tells every other worker about a change to one of this worker's players.
+        Changes made here to other workers' players are not theirs to publish.
+        """
+        if client_id in self.remote_clients:
+            return
+        message = {'type': 'presence', 'client_id': client_id, 'state': state}
+        for worker in self.peers:
+            self.send_to_worker(worker, message)
+
+    def get_client_id(self, client_socket) -> Optional[str]:
+        if isinstance(client_socket, RemoteClient):
+            return client_socket.client_id
+        return super().get_client_id(client_socket)
+
+    def send_message_to_client(self, client_socket, message: dict) -> None:
+        if isinstance(client_socket, RemoteClient):
+            self.send_to_worker(client_socket.worker, {'type': 'deliver', 'client_id': client_socket.client_id,
+                                                       'message': self._tag_reply(client_socket, message)})
+        else:
+            super().send_message_to_client(client_socket, message)
+
+    def notify_players(self, client_ids: list, message: dict) -> None:
+        local = []
+        for client_id in client_ids:
+            connection = self.clients.get(client_id)
+            if connection is not None:
+                local.append(connection.socket)
+            elif client_id in self.remote_clients:
+                self.send_message_to_client(RemoteClient(client_id, self.remote_clients[client_id]), message)
+        self.broadcast(local, message)
+
+    def _tag_reply(self, client_socket, message: dict) -> dict:
+        replying_to = self._replying_to
+        if (replying_to is not None and isinstance(client_socket, RemoteClient)
+                and isinstance(replying_to[0], RemoteClient) and replying_to[0].client_id == client_socket.client_id):
+            # Every message for a remote player gets a new stand-in, so compare who it stands for
+            self._replying_to = None
+            return dict(message, request_id=replying_to[1])
+        return super()._tag_reply(client_socket, message)
+
+    def process_client_message(self, client_socket, message: dict) -> None:
+        """
+        Processes a message from a client or a peer worker. Client requests for
+        a game owned by another worker, and matchmaking requests outside the
+        coordinator, are forwarded instead of being processed here.
+        """
+        worker = self.peer_workers.get(client_socket)
+        if worker is not None:
+            self.process_peer_message(worker, message)
+            return
+
+        message_type = message.get('type')
+        client_id = self.get_client_id(client_socket)
+        target = None
+        if message_type in ('guess', 'hint') and client_id is not None:
+            game_id = message.get('game_id') or self.player_games.get(client_id)
+            target = self.owner_of(game_id)
+            message = dict(message, game_id=game_id)
+        elif message_type in ('find_match', 'cancel_match') and client_id is not None:
+            # The waiting queue lives on the coordinator; players already in a game are refused here
+            if message_type == 'cancel_match' or client_id not in self.player_games:
+                target = self.COORDINATOR
+        if target is not None and target != self.index:
+            self.send_to_worker(target, {'type': 'dispatch', 'client_id': client_id, 'worker': self.index,
+                                         'message': message})
+            return
+        super().process_client_message(client_socket, message)
+
+    def process_peer_message(self, worker: int, message: dict) -> None:
+        """
+        Processes a message from another worker.
+
+        Args:
+            worker (int): The number of the worker that sent it.
+            message (dict): The decoded message.
+        """
+        message_type = message.get('type')
+        if message_type == 'presence':
+            client_id = message['client_id']
+            if message['state'] == 'gone':
+                if self.remote_clients.get(client_id) != worker:
+                    # The player already turned up on another worker after resuming their session
+                    return
+                del self.remote_clients[client_id]
+            else:
+                self.remote_clients[client_id] = worker
+            self.matchmaker.apply_presence(client_id, message['state'])
+        elif message_type == 'deliver':
+            self._deliver(message['client_id'], message['message'])
+        elif message_type == 'dispatch':
+            remote = RemoteClient(message['client_id'], message['worker'])
+            # Replies to a forwarded request still echo its request_id
+            replying_to, self._replying_to = self._replying_to, self._request_of(remote, message['message'])
+            try:
+                super().process_client_message(remote, message['message'])
+            finally:
+                self._replying_to = replying_to
+        elif message_type == 'claim':
+            claimed = self._claim(message['game_id'], message['client_id'])
+            self.send_to_worker(worker, {'type': 'claim_result', 'game_id': message['game_id'],
+                                         'client_id': message['client_id'], 'claimed': claimed})
+        elif message_type == 'claim_result':
+            self._claim_finished(message['game_id'], message['client_id'], worker, message['claimed'])
+        elif message_type == 'release':
+            self._release_local(message['game_id'], message['client_id'])
+        elif message_type == 'end_game':
+            self.end_game(message['game_id'], message['reason'])
+        elif message_type == 'resume_session':
+            self.send_to_worker(worker, dict(self._hand_over_session(message['token']), type='session_resumed',
+                                             token=message['token']))
+        elif message_type == 'session_resumed':
+            self._resume_finished(message['token'], message.get('client_id'), message.get('game_id'))
+        else:
+            print(f"Unknown message from worker {worker}: {message_type}")
+
+    def authenticate_client(self, client_socket, password: str, session_token: Optional[str] = None,
+                            codecs: Optional[list] = None) -> None:
+        """
+        Authenticates a client, asking the worker that issued its session token
+        to hand the player over if that is another worker.
+        """
+        connection = self.connections[client_socket]
+        worker = self.issuer_of(session_token)
+        if (worker is None or worker == self.index or worker not in self.peers or connection.auth_pending
+                or session_token in self._pending_resumes):
+            super().authenticate_client(client_socket, password, session_token, codecs)
+            return
+        connection.auth_pending = True
+        self._pending_resumes[session_token] = (connection, password, codecs, self._replying_to, worker)
+        self.send_to_worker(worker, {'type': 'resume_session', 'token': session_token})
+
+    def _hand_over_session(self, session_token: str) -> dict:
+        """
+        Consumes a session token issued here for a player reconnecting to another
+        worker. Their old connection, if it is still open, is dropped without
+        ending their game, which follows them to the new worker.
+
+        Returns:
+            dict: The client_id and game_id of the player, or nothing if the token is unknown or expired.
+        """
+        client_id = self.authenticator.resume_session(session_token)
+        if client_id is None:
+            return {}
+        game_id = self.player_games.pop(client_id, None)
+        self.matchmaker.remove(client_id)
+        previous = self.clients.pop(client_id, None)
+        if previous is not None:
+            previous.client_id = None
+            self.disconnect_client(previous.socket)
+        return {'client_id': client_id, 'game_id': game_id}
+
+    def _resume_finished(self, session_token: str, client_id: Optional[str], game_id: Optional[str]) -> None:
+        """
+        Completes a session resume once the issuing worker has answered.
+        """
+        pending = self._pending_resumes.pop(session_token, None)
+        if pending is None:
+            return
+        connection, password, codecs, replying_to, _ = pending
+        connection.auth_pending = False
+        if connection.closed:
+            if game_id is not None:
+                self.end_game(game_id, 'player_disconnected')
+            return
+        if game_id is not None:
+            self.player_games[client_id] = game_id
+        previous, self._replying_to = self._replying_to, replying_to
+        try:
+            self._resume_session(connection, session_token, client_id, password, codecs)
+        finally:
+            # Answered while handling the request itself, its reply is sent and must not be tagged again
+            if previous is not replying_to:
+                self._replying_to = previous
+
+    def start_match(self, waiting_id: str, waiting_word: str, client_id: str, word: str) -> None:
+        self.initiate_game(waiting_id, client_id, waiting_word, match_word=word)
+
+    def initiate_game(self, client_id: str, opponent_id: str, word: str, match_word: Optional[str] = None) -> None:
+        """
+        Starts a game owned by this worker once the workers of both players have
+        reserved them. Players connected here are reserved right away.
+
+        Args:
+            client_id (str): The player who picked the word.
+            opponent_id (str): The player who guesses it.
+            word (str): The word to be guessed.
+            match_word (Optional[str]): The opponent's own word if find_match paired the players, None for a challenge.
+        """
+        if opponent_id == client_id:
+            response = {'type': 'error', 'message': 'You cannot play against yourself'}
+            self.notify_players([client_id], response)
+            return
+        game_id = self.generate_unique_id('game')
+        self._pending_games[game_id] = PendingGame(client_id, opponent_id, word, self._replying_to, match_word)
+        for player_id in (client_id, opponent_id):
+            worker = self.locate(player_id)
+            if worker == self.index:
+                self._claim_finished(game_id, player_id, worker, self._claim(game_id, player_id))
+            elif worker is None:
+                self._claim_finished(game_id, player_id, worker, False)
+            else:
+                self.send_to_worker(worker, {'type': 'claim', 'game_id': game_id, 'client_id': player_id})
+
+    def end_game(self, game_id: str, reason: str = 'ended') -> None:
+        owner = self.owner_of(game_id)
+        if owner is not None and owner != self.index:
+            self.send_to_worker(owner, {'type': 'end_game', 'game_id': game_id, 'reason': reason})
+            return
+        pending = self._pending_games.get(game_id)
+        if pending is not None:
+            # A player left before the game started; it is called off once the claims are answered
+            pending.cancelled = True
+            return
+        super().end_game(game_id, reason)
+
+    def disconnect_client(self, client_socket) -> None:
+        worker = self.peer_workers.pop(client_socket, None)
+        if worker is not None:
+            print(f"Lost connection to worker {worker}")
+            self.peers.pop(worker, None)
+            for client_id in [client_id for client_id, location in self.remote_clients.items() if location == worker]:
+                del self.remote_clients[client_id]
+                self.matchmaker.apply_presence(client_id, 'gone')
+            for token in [token for token, pending in self._pending_resumes.items() if pending[4] == worker]:
+                self._resume_finished(token, None, None)
+        connection = self.connections.get(client_socket)
+        client_id = connection.client_id if connection else None
+        super().disconnect_client(client_socket)
+        if client_id is not None and client_id not in self.clients:
+            # The owner of a game on another worker clears its own state when it ends the game
+            self.player_games.pop(client_id, None)
+
+    def _complete_authentication(self, connection: Connection, client_id: str, codecs: Optional[list]) -> None:
+        super()._complete_authentication(connection, client_id, codecs)
+        if client_id in self.player_games:
+            # A resumed player still in a game is connected but not available
+            self.publish_presence(client_id, 'busy')
+
+    def _setup_event_loop(self) -> None:
+        """
+        Registers the sockets to the other workers with the event loop.
+        """
+        for worker, peer in self.peers.items():
+            peer.setblocking(False)
+            connection = Connection(peer, f"worker_{worker}")
+            self.connections[peer] = connection
+            self.peer_workers[peer] = worker
+            self.selector.register(peer, selectors.EVENT_READ, connection)
+
+    def _schedule_liveness_check(self, connection: Connection) -> None:
+        # Links to other workers are not clients; losing one is noticed when its process exits
+        if connection.socket not in self.peer_workers:
+            super()._schedule_liveness_check(connection)
+
+    def _admit(self, connection: Connection, message_type: str) -> Optional[dict]:
+        # Requests forwarded by other workers were admitted where the client is connected
+        if connection.socket in self.peer_workers:
+            return None
+        return super()._admit(connection, message_type)
+
+    def _deliver(self, client_id: str, message: dict) -> None:
+        """
+        Sends a message from another worker to a player connected here. A game
+        ending elsewhere also frees the player for a new one.
+        """
+        if message.get('type') == 'game_over' and self.player_games.get(client_id) == message.get('game_id'):
+            del self.player_games[client_id]
+            if client_id in self.clients:
+                self.matchmaker.set_available(client_id)
+        connection = self.clients.get(client_id)
+        if connection is not None:
+            super().send_message_to_client(connection.socket, message)
+
+    def _claim(self, game_id: str, client_id: str) -> bool:
+        """
+        Reserves a player connected here for a game if they are free.
+        """
+        if client_id not in self.clients or client_id in self.player_games:
+            return False
+        self.player_games[client_id] = game_id
+        self.matchmaker.set_busy(client_id)
+        return True
+
+    def _release_local(self, game_id: str, client_id: str) -> None:
+        """
+        Frees a player connected here that was reserved for a game that did not start.
+        """
+        if self.player_games.get(client_id) == game_id:
+            del self.player_games[client_id]
+            if client_id in self.clients:
+                self.matchmaker.set_available(client_id)
+
+    def _claim_finished(self, game_id: str, client_id: str, worker: Optional[int], claimed: bool) -> None:
+        """
+        Records the answer to a claim and starts or calls off the game once both are in.
+        """
+        pending = self._pending_games.get(game_id)
+        if pending is None:
+            return
+        pending.waiting.discard(client_id)
+        if claimed:
+            pending.claimed.append((client_id, worker))
+        else:
+            pending.refused.append(client_id)
+        if pending.waiting:
+            return
+        del self._pending_games[game_id]
+        replying_to, self._replying_to = self._replying_to, pending.replying_to
+        try:
+            self._start_claimed_game(game_id, pending)
+        finally:
+            # Claims answered while handling the request itself have sent its reply, which must not be tagged again
+            if replying_to is not pending.replying_to:
+                self._replying_to = replying_to
+
+    def _start_claimed_game(self, game_id: str, pending: PendingGame) -> None:
+        """
+        Starts a game both of whose players were reserved, or calls it off and
+        releases whoever was reserved.
+        """
+
+        if pending.refused or pending.cancelled:
+            for player_id, player_worker in pending.claimed:
+                if player_worker == self.index:
+                    self._release_local(game_id, player_id)
+                else:
+                    self.send_to_worker(player_worker, {'type': 'release', 'game_id': game_id, 'client_id': player_id})
+            if pending.match_word is not None:
+                self._rematch_players(pending)
+                return
+            # A challenge: only the player who picked the word asked for anything
+            if pending.player1 in pending.refused:
+                error = 'You are already in a game'
+            elif pending.refused:
+                error = 'Opponent is already in a game'
+            else:
+                error = 'Opponent disconnected'
+            self.notify_players([pending.player1], {'type': 'error', 'message': error})
+            return
+
+        game = Game()
+        game.start_game(pending.player1, pending.player2, pending.word)
+        self.snapshots.publish(game_id, game)
+        self.games.add(game_id, game)
+        self.timers.call_later(self.game_idle_timeout, self._check_game_idle, game_id)
+        response = {'type': 'game_started', 'game_id': game_id, 'player1': pending.player1, 'player2': pending.player2,
+                    'word_length': game.word_length}
+        self.notify_players([pending.player1, pending.player2], response)
+        self.events.publish(game_id, response)
+
+
+    def _rematch_players(self, pending: PendingGame) -> None:
+        """
+        Sends the players of a match that was called off back to looking for
+        another, if they are still connected and free: first the one who had
+        been waiting, silently, then the one whose find_match made the pair,
+        who is answered with match_queued or the game they are paired into.
+        """
+        replying_to, self._replying_to = self._replying_to, None
+        try:
+            if pending.player1 not in pending.refused and self.is_connected(pending.player1):
+                self._rematch(pending.player1, pending.word)
+        finally:
+            self._replying_to = replying_to
+        if pending.player2 not in pending.refused and self.is_connected(pending.player2):
+            if self._rematch(pending.player2, pending.match_word):
+                return
+            response = {'type': 'match_queued'}
+        else:
+            response = {'type': 'error', 'message': 'Only players that are not in a game can find a match'}
+        # Skipped if the player has disconnected
+        self.notify_players([pending.player2], response)
+
+    def _rematch(self, client_id: str, word: str) -> bool:
+        """
+        Puts a player back in the waiting queue, starting a game if someone is waiting there.
+
+        Returns:
+            bool: True if the player was paired, False if they were queued.
+        """
+        match = self.matchmaker.enqueue(client_id, word)
+        if match is None:
+            return False
+        waiting_id, waiting_word = match
+        self.initiate_game(waiting_id, client_id, waiting_word, match_word=word)
+        return True
+
+
+class WorkerPool:
+    """
+    The WorkerPool class forks worker processes that share one TCP port, so
+    the game server uses as many cores as there are workers. The web
+    interface reads the state of a single process and is not available in
+    this mode.
+    """
+
+    def __init__(self, worker_count: int, host: str = 'localhost', port: int = 12345, **options):
+        """
+        Initializes the pool.
+
+        Args:
+            worker_count (int): The number of worker processes.
+            host (str): The hostname to listen on.
+            port (int): The TCP port.
+            **options: Further keyword arguments for every WorkerServer.
+        """
+        self.worker_count = worker_count
+        self.host = host
+        self.port = port
+        self.options = options
+        self.processes = []
+
+    def start(self) -> None:
+        """
+        Connects every pair of workers and forks them.
+        """
+        pairs = {}
+        for first in range(self.worker_count):
+            for second in range(first + 1, self.worker_count):
+                pairs[first, second] = socket.socketpair()
+        context = multiprocessing.get_context('fork')
+        for index in range(self.worker_count):
+            process = context.Process(target=run_worker, name=f"worker-{index}",
+                                      args=(index, self.worker_count, pairs, self.host, self.port, self.options))
+            process.start()
+            self.processes.append(process)
+        # Only the workers use the pairs; closing the parent's copies lets a worker notice when a peer dies
+        for pair in pairs.values():
+            for sock in pair:
+                sock.close()
+
+    def wait(self) -> None:
+        for process in self.processes:
+            process.join()
+
+    def stop(self) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.wait()
+
+    def run(self) -> None:
+        """
+        Starts the workers and waits until they exit or the pool is interrupted.
+        """
+        self.start()
+        # Terminating the pool unwinds through stop() instead of leaving the workers serving the port
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            self.wait()
+        finally:
+            self.stop()
+
+
+def run_worker(index: int, worker_count: int, pairs: dict, host: str, port: int, options: dict) -> None:
+    """
+    The entry point of a worker process.
+
+    Args:
+        index (int): The worker's number.
+        worker_count (int): The number of workers.
+        pairs (dict): (lower worker, higher worker): socketpair, for every pair of workers.
+        host (str): The hostname to listen on.
+        port (int): The TCP port.
+        options (dict): Further keyword arguments for the WorkerServer.
+    """
+    peers = {}
+    for (first, second), (first_end, second_end) in pairs.items():
+        if first == index:
+            peers[second] = first_end
+            second_end.close()
+        elif second == index:
+            peers[first] = second_end
+            first_end.close()
+        else:
+            first_end.close()
+            second_end.close()
+    WorkerServer(index, worker_count, peers, host, port, **options).start_server()